@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+import main
+
+# name on the command line -> how to apply it inside a worker
+TUNABLES = {
+    "spawn_interval": lambda value: setattr(main.ConveyorSpawnerBehaviour, "interval", value),
+    "interact_range": lambda value: setattr(main, "INTERACT_RANGE", value),
+    "drop_radius": lambda value: setattr(main, "PACKAGE_DROP_RADIUS", value),
+    "heavy_weight": lambda value: setattr(main.HeavyPackageBehaviour, "weight_modifier", value),
+    "staff": lambda value: setattr(main, "STAFF", int(value)),
+}
+
+RESULT_FIELDS = ("delivered", "delivered_per_minute", "backlog", "in_flight", "ticks_per_second")
+
+
+def parse_grid(entries: list[str]) -> dict[str, list[float]]:
+    """parses `name=1,2,3` entries into the values to sweep for every tunable"""
+    grid: dict[str, list[float]] = {}
+    for entry in entries:
+        name, values = entry.split("=")
+        assert name in TUNABLES, f"unknown tunable {name}, expected one of {', '.join(TUNABLES)}"
+        grid[name] = [float(value) for value in values.split(",")]
+    return grid
+
+
+def run_simulation(job: tuple[dict[str, float], int, str, int, float, bool]) -> tuple[dict[str, float], int, dict[str, float]]:
+    """one seeded bot run, executed inside a worker process"""
+    params, seed, level, ticks, dt, array_packages = job
+    for name, value in params.items():
+        TUNABLES[name](value)
+
+    main.seed_simulation(seed)
+    game = main.HeadlessGame(level, array_packages=array_packages)
+    game.use_input(main.BotInput(game.office, game.player))
+    ticks_per_second = game.run(ticks, dt)
+
+    office = game.office
+    in_flight = len(office.package_store) if office.package_store != None else len(office.packages)
+    return params, seed, {
+        "delivered": office.packages_delivered,
+        "delivered_per_minute": office.packages_delivered / (ticks * dt / 60_000),
+        "backlog": office.backlog,
+        "in_flight": in_flight,
+        "ticks_per_second": ticks_per_second,
+    }
+
+
+def run_batch(grid: dict[str, list[float]], seeds: int, level: str, ticks: int, dt: float,
+              workers: int, array_packages: bool = False) -> list[tuple[dict[str, float], int, dict[str, float]]]:
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    jobs = [(params, seed, level, ticks, dt, array_packages) for params in combinations for seed in range(seeds)]
+
+    # every job is independent, so the pool only ever moves a few small tuples around
+    with multiprocessing.Pool(workers) as pool:
+        return list(pool.imap_unordered(run_simulation, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def write_results(path: str, names: list[str], results: list[tuple[dict[str, float], int, dict[str, float]]]) -> None:
+    """one row per parameter combination with the mean, min and max of every result over the seeds"""
+    groups: dict[tuple, list[dict[str, float]]] = {}
+    for params, _, result in results:
+        groups.setdefault(tuple(params[name] for name in names), []).append(result)
+
+    header = list(names) + ["runs"]
+    for field in RESULT_FIELDS:
+        header += [f"{field}_mean", f"{field}_min", f"{field}_max"]
+
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for key in sorted(groups):
+            runs = groups[key]
+            row = list(key) + [len(runs)]
+            for field in RESULT_FIELDS:
+                values = [run[field] for run in runs]
+                row += [f"{statistics.mean(values):.3f}", f"{min(values):.3f}", f"{max(values):.3f}"]
+            writer.writerow(row)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="sweep tunables over many seeded headless bot runs")
+    parser.add_argument("grid", nargs="*", help=f"values to sweep, i.e spawn_interval=2,4,6 ({', '.join(TUNABLES)})")
+    parser.add_argument("--seeds", type=int, default=8, help="seeded runs per parameter combination")
+    parser.add_argument("--ticks", type=int, default=36_000, help="ticks per run")
+    parser.add_argument("--dt", type=float, default=1000 / main.TICK_RATE, help="milliseconds per tick")
+    parser.add_argument("--map", type=str, default=main.level_path(main.Level.test), help="level file to simulate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--array-packages", action="store_true", help="store packages in numpy columns")
+    parser.add_argument("--out", type=str, default="balance.csv", help="csv file for the aggregated results")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    grid = parse_grid(args.grid)
+
+    start = time.perf_counter()
+    results = run_batch(grid, args.seeds, args.map, args.ticks, args.dt, args.workers, args.array_packages)
+    elapsed = time.perf_counter() - start
+
+    write_results(args.out, list(grid), results)
+    simulated = len(results) * args.ticks
+    print(f"{len(results)} runs on {args.workers} workers in {elapsed:.1f}s, {simulated / elapsed:.0f} ticks/sec overall")
+    print(f"results written to {args.out}")
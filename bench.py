@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import os
+# everything runs without a window, set before pygame gets imported through main
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame
+
+import main
+
+PACKAGE_COUNTS = (10, 100, 1_000, 10_000)
+STAFF_COUNTS = (8, 32)
+UPDATE_TICKS = 30
+POSTMAN_TICKS = 100
+RENDER_FRAMES = 30
+LARGE_LEVEL = (256, 128)
+
+
+def belt_level(width: int, belts: int) -> str:
+    """a level of `belts` parallel belts, each running from a spawner on the right into an end on the left"""
+    wall = ",".join(["¤"] * width)
+    floor = ",".join(["¤"] + [" "] * (width - 2) + ["¤"])
+    belt = ",".join(["¤", "-e"] + ["-"] * (width - 4) + ["+", "¤"])
+    start = ",".join(["x", "X"] + [" "] * (width - 3) + ["¤"])
+    rows = [wall, start]
+    for _ in range(belts):
+        rows += [belt, floor]
+    rows.append(wall)
+    return "\n".join(rows) + "\n"
+
+
+def write_level(directory: str, name: str, source: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(source)
+    return path
+
+
+def fill_belts(office: main.Office, count: int) -> None:
+    """spreads `count` packages evenly over every belt cell of the map"""
+    flow = office.flow
+    cells = [i for i, distance in enumerate(flow.distance) if distance > 0]
+    assert len(cells) >= count, f"the map only has {len(cells)} belt cells for {count} packages"
+    stride = len(cells) / count
+    for i in range(count):
+        cell = cells[int(i * stride)]
+        office.spawn_package(((cell % flow.width) * main.SIZE, (cell // flow.width) * main.SIZE), main.Direction.left)
+
+
+def scenario_load(level: main.Level | str):
+    def run() -> None:
+        main.Office(size=main.SIZE).generate_map(level)
+    return run, None
+
+
+def scenario_office_update(level: str, count: int, array_packages: bool):
+    main.seed_simulation(0)
+    # every package moves every tick, none of them are paused for being far from the camera
+    office = main.Office(size=main.SIZE, array_packages=array_packages, cull_simulation=False)
+    office.generate_map(level)
+    fill_belts(office, count)
+    assert all(office.is_active(main.Vec2(x, y)) for x, y, *_ in office._snapshot_packages())
+    # every run starts from the same crowded state
+    snapshot = office.snapshot()
+
+    def run() -> None:
+        for _ in range(UPDATE_TICKS):
+            office.update(1000 / main.TICK_RATE)
+    return run, lambda: office.restore(snapshot)
+
+
+def scenario_postman_walls():
+    office = main.Office(size=main.SIZE)
+    office.generate_map(main.Level.test)
+    player = office.get_player()
+    player.input = main.ScriptedInput.from_string("0:d")
+    player.input.advance()
+    # the worst case, every solid tile of the map is a candidate and none of them is hit
+    size = office.size
+    walls = [pygame.Rect(i % office.map.width * size, i // office.map.width * size, size, size)
+             for i, walkable in enumerate(office.map.walkable_cells) if not walkable]
+    start = player.pos.copy()
+
+    def reset() -> None:
+        player.pos.set_from(start)
+        player.prev_pos.set_from(start)
+
+    def run() -> None:
+        for _ in range(POSTMAN_TICKS):
+            player.colissions = walls
+            player.update(1000 / main.TICK_RATE)
+            player.pos.set_from(start)
+    return run, reset
+
+
+_GAME: main.Game | None = None
+
+def game() -> main.Game:
+    """one window for every render scenario, pygame only has the one display"""
+    global _GAME
+    if _GAME == None:
+        pygame.init()
+        main.seed_simulation(0)
+        _GAME = main.Game(main.DISPLAY_DIMESION)
+        _GAME.player.input = main.BotInput(_GAME.office, _GAME.player)
+        for _ in range(600):
+            _GAME.player.input.advance()
+            _GAME.update(_GAME.timestep)
+    return _GAME
+
+
+def scenario_render_full():
+    current = game()
+
+    def run() -> None:
+        for _ in range(RENDER_FRAMES):
+            current.office.render(current.surf, 1)
+            current._render_player(1)
+            current.render_ui(current.surf)
+            current._draw_surface_on_display()
+    return run, None
+
+
+def scenario_render_dirty():
+    current = game()
+    current.office.render(current.surf, 1)
+    current._render_player(1)
+    current.render_ui(current.surf)
+    current._draw_surface_on_display()
+
+    def run() -> None:
+        for _ in range(RENDER_FRAMES):
+            current.player.input.advance()
+            current.update(current.timestep)
+            current._render_dirty(1)
+    return run, None
+
+
+def scenario_steady(minutes: float):
+    ticks = int(minutes * 60 * main.TICK_RATE)
+
+    def run() -> None:
+        main.seed_simulation(0)
+        headless = main.HeadlessGame(main.Level.test)
+        headless.use_input(main.BotInput(headless.office, headless.player))
+        headless.run(ticks, 1000 / main.TICK_RATE)
+    return run, None
+
+
+def scenario_staff(count: int):
+    main.seed_simulation(0)
+    headless = main.HeadlessGame(main.Level.test, staff=count)
+    headless.use_input(main.BotInput(headless.office, headless.player))
+    # past the start, so every bot has a package to go for
+    headless.run(600, 1000 / main.TICK_RATE)
+    snapshot = headless.snapshot()
+
+    def run() -> None:
+        headless.run(UPDATE_TICKS, 1000 / main.TICK_RATE)
+    return run, lambda: headless.restore(snapshot)
+
+
+def scenarios(directory: str, minutes: float) -> dict:
+    """name -> (what one run covers, a function building the run and its reset)"""
+    width, height = LARGE_LEVEL
+    large = write_level(directory, "large", belt_level(width, height // 2))
+    crowded = write_level(directory, "crowded", belt_level(128, max(PACKAGE_COUNTS) // 125 + 1))
+
+    found = {
+        "load/test": ("generate_map of the test level", lambda: scenario_load(main.Level.test)),
+        "load/large": (f"generate_map of a {width}x{height} belt level", lambda: scenario_load(large)),
+        "postman/walls": (f"{POSTMAN_TICKS} Postman.update against every wall", scenario_postman_walls),
+        "render/full": (f"{RENDER_FRAMES} frames of Office.render and _draw_surface_on_display", scenario_render_full),
+        "render/dirty": (f"{RENDER_FRAMES} ticks and dirty renders", scenario_render_dirty),
+        "steady/test": (f"{minutes:g} simulated minutes of the bot on the test level", lambda: scenario_steady(minutes)),
+    }
+    for count in STAFF_COUNTS:
+        found[f"staff/{count}"] = (f"{UPDATE_TICKS} ticks of the player and {count} bots on the test level",
+                                   lambda count=count: scenario_staff(count))
+    for count in PACKAGE_COUNTS:
+        found[f"office.update/objects/{count}"] = (f"{UPDATE_TICKS} Office.update with {count} packages",
+                                                   lambda count=count: scenario_office_update(crowded, count, False))
+        if main.load_numpy():
+            found[f"office.update/array/{count}"] = (f"{UPDATE_TICKS} Office.update with {count} array packages",
+                                                     lambda count=count: scenario_office_update(crowded, count, True))
+    return found
+
+
+def measure(run, reset, repeat: int, warmup: int) -> list[float]:
+    """milliseconds every run took, resets are not timed"""
+    samples = []
+    for i in range(warmup + repeat):
+        if reset != None:
+            reset()
+        start = time.perf_counter()
+        run()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "median_ms": statistics.median(ordered),
+        "mean_ms": statistics.mean(ordered),
+        "min_ms": ordered[0],
+        "p95_ms": main.percentile(ordered, 95),
+        "runs": len(ordered),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """prints every scenario against the baseline and returns the ones slower than the threshold allows"""
+    failed = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before == None:
+            print(f"{name:>30}: {result['median_ms']:10.3f}ms  (new)")
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else 1
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "SLOWER"
+            failed.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(f"{name:>30}: {result['median_ms']:10.3f}ms  baseline {before['median_ms']:10.3f}ms  {ratio:5.2f}x  {status}")
+    return failed
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="headless benchmarks of the simulation, rendering and loading hot paths")
+    parser.add_argument("--filter", type=str, default="", help="only run scenarios whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before the timed ones")
+    parser.add_argument("--minutes", type=float, default=.5, help="simulated minutes for the steady state scenario")
+    parser.add_argument("--out", type=str, default=None, help="write the results as json")
+    parser.add_argument("--baseline", type=str, default=None, help="results json to compare against")
+    parser.add_argument("--threshold", type=float, default=.15, help="fail when a median is this much slower than the baseline")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    with tempfile.TemporaryDirectory() as directory:
+        found = scenarios(directory, args.minutes)
+        if args.list:
+            for name, (description, _) in found.items():
+                print(f"{name:>30}: {description}")
+            sys.exit()
+
+        results = {}
+        for name, (description, build) in found.items():
+            if args.filter not in name:
+                continue
+            run, reset = build()
+            results[name] = summarize(measure(run, reset, args.repeat, args.warmup))
+            results[name]["description"] = description
+            print(f"{name:>30}: {results[name]['median_ms']:10.3f}ms median, {results[name]['p95_ms']:10.3f}ms p95", flush=True)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": main.np.__version__ if main.load_numpy() else None,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out != None:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"results written to {args.out}")
+
+    if args.baseline != None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        print(f"\ncompared to {args.baseline}, failing above {args.threshold:.0%} slower")
+        failed = compare(results, baseline, args.threshold)
+        if failed:
+            sys.exit(f"{len(failed)} scenarios got slower: {', '.join(failed)}")
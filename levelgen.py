@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from collections import deque
+
+import main
+
+# tries per thing placed before the level is considered full, and per level before none is workable
+ATTEMPTS = 200
+# tokens a postman can walk on
+WALKABLE = (" ", "X")
+
+
+class LevelLayout:
+    """a level being generated, as rows of level tokens and which cells are already spoken for"""
+    def __init__(self, width: int, height: int, rng: random.Random) -> None:
+        self.width = width
+        self.height = height
+        self.rng = rng
+        self.rows = [[" "] * width for _ in range(height)]
+        self.taken = [[False] * width for _ in range(height)]
+        # (x, y, length) of every belt and the cells of every token placed through add_token
+        self.belts: list[tuple[int, int, int]] = []
+        self.placed: dict[str, list[tuple[int, int]]] = {}
+        for x in range(width):
+            self.put(x, 0, "#")
+            self.put(x, height - 1, "¤")
+        for y in range(height):
+            self.put(0, y, "¤")
+            self.put(width - 1, y, "¤")
+
+    def put(self, x: int, y: int, token: str) -> None:
+        self.rows[y][x] = token
+        self.taken[y][x] = True
+
+    def is_free(self, left: int, top: int, right: int, bottom: int) -> bool:
+        """whether nothing was placed in the inclusive rect, off the map counts as taken"""
+        if left < 0 or top < 0 or right >= self.width or bottom >= self.height:
+            return False
+        return not any(self.taken[y][x] for y in range(top, bottom + 1) for x in range(left, right + 1))
+
+    def reserve(self, left: int, top: int, right: int, bottom: int) -> None:
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                self.taken[y][x] = True
+
+    def free_cell(self, right: int = 0) -> tuple[int, int] | None:
+        """a random free cell, with `right` more free cells to the right of it"""
+        for _ in range(ATTEMPTS):
+            x = self.rng.randint(1, self.width - 2 - right)
+            y = self.rng.randint(1, self.height - 2)
+            if self.is_free(x, y, x + right, y):
+                return (x, y)
+        return None
+
+    def add_belt(self, max_length: int) -> bool:
+        """
+        a belt along one row from a spawner into an end, pointing either way.
+        the row below it stays floor, since packages are picked up from there.
+        """
+        for _ in range(ATTEMPTS):
+            # a free column on either side, so belts never run into each other
+            length = self.rng.randint(4, max(4, min(max_length, self.width - 4)))
+            x = self.rng.randint(2, max(2, self.width - 2 - length))
+            y = self.rng.randint(1, self.height - 3)
+            if not self.is_free(x - 1, y, x + length, y + 1):
+                continue
+            belt = ["-e"] + ["-"] * (length - 2) + ["+"]
+            if self.rng.random() < .5:
+                belt.reverse()
+            for i, token in enumerate(belt):
+                self.put(x + i, y, token)
+            self.reserve(x - 1, y, x + length, y + 1)
+            self.belts.append((x, y, length))
+            return True
+        return False
+
+    def add_wall_cluster(self, size: int) -> bool:
+        """a random walk of wall cells, it goes around whatever was placed before it"""
+        cell = self.free_cell()
+        if cell == None:
+            return False
+        x, y = cell
+        for _ in range(size):
+            if self.is_free(x, y, x, y):
+                self.put(x, y, self.rng.choice(("#", "¤")))
+            dx, dy = self.rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            x = min(max(x + dx, 1), self.width - 2)
+            y = min(max(y + dy, 1), self.height - 2)
+        return True
+
+    def add_token(self, token: str, right: int = 0) -> bool:
+        cell = self.free_cell(right)
+        if cell == None:
+            return False
+        self.put(cell[0], cell[1], token)
+        self.reserve(cell[0], cell[1], cell[0] + right, cell[1])
+        self.placed.setdefault(token, []).append(cell)
+        return True
+
+    def reachable(self, start: tuple[int, int]) -> set[tuple[int, int]]:
+        """every cell a postman can walk to from `start`"""
+        reached = {start}
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if cell not in reached and self.rows[cell[1]][cell[0]] in WALKABLE:
+                    reached.add(cell)
+                    queue.append(cell)
+        return reached
+
+    def workable(self) -> bool:
+        """whether the player start can walk below every belt and next to every drop off"""
+        reached = self.reachable(self.placed["X"][0])
+        for x, y, length in self.belts:
+            if not any((bx, y + 1) in reached for bx in range(x, x + length)):
+                return False
+        for x, y in self.placed.get("x", []):
+            if not any((x + dx, y + dy) in reached for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                return False
+        return True
+
+    def fill(self, conveyors: int, stampers: int, wall_clusters: int, drop_ofs: int,
+             belt_length: int, cluster_size: int) -> str | None:
+        """places everything, returns what did not fit or None"""
+        placed = sum(self.add_belt(belt_length) for _ in range(conveyors))
+        if placed != conveyors:
+            return f"only {placed} of {conveyors} conveyor lines fit"
+        # the drop off is solid, the floor to the right of it is kept free so it has at least one open side
+        placed = sum(self.add_token("x", right=1) for _ in range(drop_ofs))
+        if placed != drop_ofs:
+            return f"only {placed} of {drop_ofs} drop offs fit"
+        if not self.add_token("X"):
+            return "no room left for the player"
+        placed = sum(self.add_token("t") for _ in range(stampers))
+        if placed != stampers:
+            return f"only {placed} of {stampers} stampers fit"
+        for _ in range(wall_clusters):
+            self.add_wall_cluster(cluster_size)
+        return None
+
+    def to_string(self) -> str:
+        return "\n".join(",".join(row) for row in self.rows) + "\n"
+
+
+def generate_level(width: int, height: int, seed: int = 0, conveyors: int = 4, stampers: int = 2,
+                   wall_clusters: int = 4, drop_ofs: int = 1, belt_length: int = 32, cluster_size: int = 8) -> str:
+    """
+    a random level in the comma separated format, the same arguments always give the same level.
+    belts go first, so a crowded map runs out of room for walls rather than belts.
+    layouts where the player could not walk to every belt and drop off are thrown away.
+    """
+    assert width >= 8 and height >= 5, "a level needs at least 8x5 cells"
+    rng = random.Random(seed)
+    problem = ""
+    for _ in range(ATTEMPTS):
+        layout = LevelLayout(width, height, rng)
+        problem = layout.fill(conveyors, stampers, wall_clusters, drop_ofs, belt_length, cluster_size)
+        if problem == None and not layout.workable():
+            problem = "the player could not walk to every belt and drop off"
+        if problem == None:
+            return layout.to_string()
+    assert False, f"no workable {width}x{height} level in {ATTEMPTS} layouts, {problem}"
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="generate seeded levels of any size, for stress tests and benchmarks")
+    parser.add_argument("out", type=str, help="level file to write")
+    parser.add_argument("--width", type=int, default=main.MAP_WIDTH, help="cells across")
+    parser.add_argument("--height", type=int, default=main.MAP_HEIGHT, help="cells down")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same level")
+    parser.add_argument("--conveyors", type=int, default=4, help="conveyor lines, each a spawner running into an end")
+    parser.add_argument("--belt-length", type=int, default=32, help="longest a conveyor line gets")
+    parser.add_argument("--stampers", type=int, default=2, help="stampers")
+    parser.add_argument("--walls", type=int, default=4, help="wall clusters")
+    parser.add_argument("--cluster-size", type=int, default=8, help="steps of the random walk drawing a wall cluster")
+    parser.add_argument("--drop-ofs", type=int, default=1, help="drop off points")
+    parser.add_argument("--compiled", action="store_true", help="write the binary compiled format, which loads without parsing")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    source = generate_level(args.width, args.height, args.seed, args.conveyors, args.stampers,
+                            args.walls, args.drop_ofs, args.belt_length, args.cluster_size)
+    level = main.compile_level(source)
+    if args.compiled:
+        with open(args.out, "wb") as file:
+            file.write(level.to_bytes())
+    else:
+        with open(args.out, "w", encoding="utf-8") as file:
+            file.write(source)
+    print(f"{args.out}: {level.width}x{level.height}, {len(level.spawners)} spawners, "
+          f"{len(level.drop_ofs)} drop offs, {sum(1 for tile in level.tiles if tile == main.TileType.stamper.value)} stampers")
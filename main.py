@@ -1,13 +1,43 @@
 #!/usr/bin/env python
 
 from __future__ import annotations
-from typing import Protocol
+import time
+# the startup timeline counts from here, before the heavy imports
+IMPORT_START = time.perf_counter()
+
+from typing import Collection, Protocol
 
 import pygame
 import sys
 import enum
 import math
 import random
+import argparse
+import struct
+import json
+import contextlib
+import heapq
+import hashlib
+import os
+import zlib
+import io
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# numpy is only imported once the array package path asks for it, see load_numpy
+np = None
+
+def load_numpy() -> bool:
+    """imports numpy on first use and returns whether it is installed, it is the largest part of the import otherwise"""
+    global np
+    if np == None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
 
 #DEFINES
 DISPLAY_DIMESION = (1080, 720)
@@ -15,12 +45,25 @@ RENDER_DIMENSION = (400, 240)
 
 SIZE = 16
 FPS = 60
+TICK_RATE = 60
+MAX_FRAME_TIME = 250
 MAP_WIDTH = 25
 MAP_HEIGHT = 11
+VIEW_DIMENSION = (RENDER_DIMENSION[0], MAP_HEIGHT * SIZE)
+CHUNK_SIZE = 16
+CHUNK_CACHE_SIZE = 64
+TEXT_CACHE_SIZE = 128
+ATLAS_WIDTH = 256
+PROMPT_TEXT_SIZE = 12
+STAMPER_PROMPT = "stamp"
 INTERACT_INTERVAL = .6
 INTERACT_RANGE = 15
 PACKAGE_DROP_RADIUS = 17
+# pixels a postman clipping a corner gets pushed aside by instead of stopping
+CORNER_NUDGE = 4
 SPAWN_INTERVAL = 4
+# scripted postmen working alongside the player in headless runs
+STAFF = 0
 
 
 class Interactable(Protocol):
@@ -30,6 +73,9 @@ class Interactable(Protocol):
     def behaviour(self) -> PackageBehaviour :
         ...
 
+    def move_to(self, pos: Vec2) -> None:
+        ...
+
     def interact(self, postman: Postman) -> None:
         ...
 
@@ -39,18 +85,249 @@ class Interactable(Protocol):
     def __str__(self) -> str:
         ...
 
+def decode_image(path: str) -> pygame.Surface:
+    """reads and decodes a png without touching the display, so it is safe off the main thread"""
+    with open(path, "rb") as file:
+        data = file.read()
+    return pygame.image.load(io.BytesIO(data), path)
+
+def convert_image(image: pygame.Surface) -> pygame.Surface:
+    # convert_alpha needs a display mode, which headless runs never create
+    if pygame.display.get_init() and pygame.display.get_surface() != None:
+        return image.convert_alpha()
+    return image
+
+def load_image(path: str) -> pygame.Surface:
+    return convert_image(pygame.image.load(path))
+
+def asset_paths(directory: str = "assets") -> list[str]:
+    return [f"{directory}/{name}" for name in sorted(os.listdir(directory)) if name.endswith(".png")]
+
+def slice_sheet(sheet: pygame.Surface, dimensions: tuple[int, int]) -> list[pygame.Surface]:
+    images = []
+    for i in range(sheet.get_width() // dimensions[1]):
+        rect = pygame.Rect((dimensions[0] * i, 0, dimensions[0], dimensions[1]))
+        image = pygame.Surface(rect.size)
+        image.blit(sheet, (0, 0), rect)
+        images.append(image)
+    return images
+
+class AssetCache:
+    """process-wide image and spritesheet cache, the surfaces it hands out are shared and must be treated as read-only"""
+    def __init__(self) -> None:
+        self._images: dict[str, pygame.Surface] = {}
+        self._frames: dict[tuple, list[pygame.Surface]] = {}
+        # decodes started by preload that nobody has picked up yet
+        self._pending: dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, paths: list[str], workers: int | None = None) -> None:
+        """
+        starts decoding the images on a thread pool and returns straight away. `image` waits for
+        the one it needs and converts it on the calling thread, so preloading can start before the display exists.
+        """
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        for path in paths:
+            if path not in self._images and path not in self._pending:
+                self._pending[path] = pool.submit(decode_image, path)
+        # the workers exit by themselves once the queue is drained
+        pool.shutdown(wait=False)
+
+    def image(self, path: str) -> pygame.Surface:
+        image = self._images.get(path)
+        if image != None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        pending = self._pending.pop(path, None)
+        image = convert_image(pending.result()) if pending != None else load_image(path)
+        self._images[path] = image
+        return image
+
+    def frames(self, path: str, dimensions: tuple[int, int] = (SIZE, SIZE),
+               fill: tuple[int, int, int] | None = None) -> list[pygame.Surface]:
+        key = (path, dimensions, fill)
+        frames = self._frames.get(key)
+        if frames != None:
+            self.hits += 1
+            return frames
+
+        self.misses += 1
+        frames = slice_sheet(self.image(path), dimensions)
+        if fill != None:
+            for frame in frames:
+                frame.fill(fill)
+        self._frames[key] = frames
+        return frames
+
+    def clear(self) -> None:
+        """drops every cached surface, i.e after the display mode changes"""
+        self._images.clear()
+        self._frames.clear()
+        self._pending.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "images": len(self._images),
+            "sheets": len(self._frames),
+        }
+
+ASSETS = AssetCache()
+
+class SpriteAtlas:
+    """
+    every sprite and sheet frame packed onto one surface, drawn by source rect so a whole
+    layer goes out in a single `Surface.blits`. sprites are packed on shelves and the
+    surface only ever grows downwards, so the rects it hands out stay valid.
+    """
+    def __init__(self, width: int = ATLAS_WIDTH, padding: int = 1) -> None:
+        self.width = width
+        self.padding = padding
+        self.surface = pygame.Surface((width, SIZE), pygame.SRCALPHA)
+        self._rects: dict[tuple, pygame.Rect] = {}
+        self._frames: dict[tuple, list[pygame.Rect]] = {}
+        self._shelf_x = 0
+        self._shelf_y = 0
+        self._shelf_height = 0
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def add(self, key: tuple, image: pygame.Surface) -> pygame.Rect:
+        rect = self._rects.get(key)
+        if rect != None:
+            return rect
+
+        width, height = image.get_size()
+        assert width <= self.width, f"{key} is wider than the atlas"
+        if self._shelf_x + width > self.width:
+            self._shelf_y += self._shelf_height + self.padding
+            self._shelf_x = 0
+            self._shelf_height = 0
+        if self._shelf_y + height > self.surface.get_height():
+            self._grow(self._shelf_y + height)
+
+        rect = pygame.Rect(self._shelf_x, self._shelf_y, width, height)
+        # the target is still fully transparent, so max copies the pixels, alpha included
+        self.surface.blit(image, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        self._shelf_x += width + self.padding
+        self._shelf_height = max(self._shelf_height, height)
+        self._rects[key] = rect
+        return rect
+
+    def image(self, path: str) -> pygame.Rect:
+        return self.add((path,), ASSETS.image(path))
+
+    def frames(self, path: str, dimensions: tuple[int, int] = (SIZE, SIZE),
+               fill: tuple[int, int, int] | None = None) -> list[pygame.Rect]:
+        key = (path, dimensions, fill)
+        rects = self._frames.get(key)
+        if rects == None:
+            rects = [self.add(key + (i,), frame) for i, frame in enumerate(ASSETS.frames(path, dimensions, fill))]
+            self._frames[key] = rects
+        return rects
+
+    def pack_directory(self, directory: str = "assets") -> None:
+        for path in asset_paths(directory):
+            self.image(path)
+
+    def convert(self) -> None:
+        """matches the atlas to the display format once there is one, which makes blitting from it cheaper"""
+        if pygame.display.get_init() and pygame.display.get_surface() != None:
+            self.surface = self.surface.convert_alpha()
+
+    def _grow(self, height: int) -> None:
+        surface = pygame.Surface((self.width, max(height, self.surface.get_height() * 2)), pygame.SRCALPHA)
+        surface.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.surface = surface
+        self.convert()
+
+    def clear(self) -> None:
+        self.surface = pygame.Surface((self.width, SIZE), pygame.SRCALPHA)
+        self._rects.clear()
+        self._frames.clear()
+        self._shelf_x = self._shelf_y = self._shelf_height = 0
+
+ATLAS = SpriteAtlas()
+
+class TextCache:
+    """
+    fonts loaded once per size and rendered text kept by (text, size, colour, background),
+    evicted least recently used first. like ASSETS the surfaces are shared and read-only.
+    """
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._fonts: dict[int, pygame.font.Font] = {}
+        self._text: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size: int) -> pygame.font.Font:
+        font = self._fonts.get(size)
+        if font == None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.SysFont(pygame.font.get_default_font(), size)
+            self._fonts[size] = font
+        return font
+
+    def render(self, text: str, size: int, colour: tuple[int, int, int] = (255, 255, 255),
+               background: tuple[int, int, int] | None = None) -> pygame.Surface:
+        key = (text, size, colour, background)
+        surface = self._text.get(key)
+        if surface != None:
+            self.hits += 1
+            self._text.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font(size).render(text, False, colour, background)
+        self._text[key] = surface
+        if len(self._text) > self.max_entries:
+            self._text.popitem(last=False)
+        return surface
+
+    def clear(self) -> None:
+        self._fonts.clear()
+        self._text.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fonts": len(self._fonts),
+            "text": len(self._text),
+        }
+
+TEXT = TextCache()
+
 class Spritesheet:
     """vertical spritesheet"""
-    def __init__(self, path: str, dimensions: tuple[int, int] = (SIZE, SIZE)) -> None:
-        self.sheet = pygame.image.load(path).convert_alpha()
+    def __init__(self, path: str, dimensions: tuple[int, int] = (SIZE, SIZE),
+                 fill: tuple[int, int, int] | None = None) -> None:
+        self.path = path
+        self.sheet = ASSETS.image(path)
         self.sprite_dimensions = dimensions
-        self.images = self._make_surfaces_from_sheet()
+        # the frames are shared between every sheet of the same path, only the index is ours
+        self.images = ASSETS.frames(path, dimensions, fill)
+        self.areas = ATLAS.frames(path, dimensions, fill)
         self._index = 0
 
     @property
     def active(self) -> pygame.Surface:
         return self.images[self._index]
 
+    @property
+    def area(self) -> pygame.Rect:
+        """where the active frame sits in ATLAS"""
+        return self.areas[self._index]
+
     @property
     def max_index(self) -> int:
         return self.sheet.get_width() // self.sprite_dimensions[1]
@@ -64,19 +341,7 @@ class Spritesheet:
         return self.active
 
     def image_at(self, index: int):
-        rect = pygame.Rect(
-            (self.sprite_dimensions[0] * index, 0,
-             self.sprite_dimensions[0], self.sprite_dimensions[1]))
-        image = pygame.Surface(rect.size)
-        image.blit(self.sheet, (0, 0), rect)
-        return image
-
-    def _make_surfaces_from_sheet(self) -> list[pygame.Surface]:
-        images = []
-        for i in range(self.max_index):
-            images.append(self.image_at(i))
-
-        return images
+        return self.images[index]
 
 class Direction(enum.Enum):
     up = enum.auto()
@@ -91,7 +356,6 @@ class Behaviour(Protocol):
     does_update = False
     animated = False
     animation_interval = 0
-    animation_delta: float = 0
 
 class WallBehaviour(Behaviour):
     pass
@@ -116,18 +380,21 @@ class ConveyorBehaviour(Behaviour):
     does_update = True
     uses_spritesheet = True
     animation_interval: float = .3
-    animation_delta: float = animation_interval
 
 class ConveyorSpawnerBehaviour(ConveyorBehaviour):
     interval: int = SPAWN_INTERVAL
-    delta: float = interval
 
     def spawn_package(self, pos: tuple[int, int], office: Office) -> None:
-        package = Package(pos, self.direction)
-        office.packages.append(package)
+        office.spawn_package(pos, self.direction)
 
 
 class Vec2:
+    """
+    the binary operators hand out new vectors, the in-place ones and `set`
+    reuse this one, which is what anything running every tick should use.
+    """
+    __slots__ = ("x", "y")
+
     def __init__(self, x: int | float, y: int | float) -> None:
         self.x = x
         self.y = y
@@ -142,6 +409,41 @@ class Vec2:
     def __sub__(self, other: Vec2) -> Vec2:
         return Vec2(self.x - other.x, self.y - other.y)
 
+    def __mul__(self, scalar: float) -> Vec2:
+        return Vec2(self.x * scalar, self.y * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar: float) -> Vec2:
+        return Vec2(self.x / scalar, self.y / scalar)
+
+    def __iadd__(self, other: Vec2) -> Vec2:
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other: Vec2) -> Vec2:
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, scalar: float) -> Vec2:
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def __itruediv__(self, scalar: float) -> Vec2:
+        self.x /= scalar
+        self.y /= scalar
+        return self
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Vec2):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    __hash__ = None # mutable
+
     def __repr__(self) -> str:
         return f"x: {self.x}, y: {self.y}"
 
@@ -151,22 +453,519 @@ class Vec2:
     def copy(self) -> Vec2:
         return Vec2(self.x, self.y)
 
+    def set(self, x: int | float, y: int | float) -> Vec2:
+        self.x = x
+        self.y = y
+        return self
+
+    def set_from(self, other: Vec2) -> Vec2:
+        self.x = other.x
+        self.y = other.y
+        return self
+
+    def iadd(self, x: int | float, y: int | float) -> Vec2:
+        self.x += x
+        self.y += y
+        return self
+
+    def isub(self, x: int | float, y: int | float) -> Vec2:
+        self.x -= x
+        self.y -= y
+        return self
+
+    def lerp(self, other: Vec2, alpha: float) -> Vec2:
+        return Vec2(self.x + (other.x - self.x) * alpha, self.y + (other.y - self.y) * alpha)
+
+    def lerp_into(self, other: Vec2, alpha: float, out: Vec2) -> Vec2:
+        return out.set(self.x + (other.x - self.x) * alpha, self.y + (other.y - self.y) * alpha)
+
     def magnitude(self) -> float:
-        return max(self.as_tuple())
+        """largest signed component, what the postman's reach has always been measured with"""
+        return max(self.x, self.y)
+
+    def length(self) -> float:
+        return math.hypot(self.x, self.y)
+
+    def distance(self, other: Vec2) -> float:
+        """euclidean distance"""
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def chebyshev_distance(self, other: Vec2) -> float:
+        """largest absolute difference along either axis, a square radius"""
+        dx = self.x - other.x
+        dy = self.y - other.y
+        if dx < 0:
+            dx = -dx
+        if dy < 0:
+            dy = -dy
+        return dx if dx > dy else dy
 
     def get_absolute_distance(self, other: Vec2) -> float:
-        return abs((self - other).magnitude())
+        return self.chebyshev_distance(other)
+
+def copy_positions(sources: list[Vec2], targets: list[Vec2]) -> None:
+    """copies every source into the matching target without allocating"""
+    for source, target in zip(sources, targets):
+        target.x = source.x
+        target.y = source.y
+
+def translate_positions(positions: list[Vec2], x: int | float, y: int | float) -> None:
+    for pos in positions:
+        pos.x += x
+        pos.y += y
+
+def nearest_position(positions: list[Vec2], target: Vec2, radius: float = math.inf) -> int:
+    """index of the position closest to target within radius, the first of any tied, -1 when there is none"""
+    nearest = -1
+    nearest_distance = radius
+    tx, ty = target.x, target.y
+    for index, pos in enumerate(positions):
+        distance = math.hypot(pos.x - tx, pos.y - ty)
+        if distance < nearest_distance or (nearest == -1 and distance <= radius):
+            nearest = index
+            nearest_distance = distance
+    return nearest
+
+def positions_within(positions: list[Vec2], target: Vec2, radius: float) -> list[int]:
+    """indices of every position within a chebyshev radius of target"""
+    tx, ty = target.x, target.y
+    return [index for index, pos in enumerate(positions)
+            if abs(pos.x - tx) <= radius and abs(pos.y - ty) <= radius]
+
+class ProfilerSection:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *_) -> None:
+        frame = self.profiler._frame
+        frame[self.name] = frame.get(self.name, 0) + (time.perf_counter_ns() - self.start) / 1e6
+
+NULL_SECTION = contextlib.nullcontext()
+
+class Profiler:
+    """
+    per-subsystem frame timings with rolling percentiles.
+    while disabled every hook hands out one shared no-op context, so they can stay in hot paths.
+    """
+    SECTIONS = ("office.update", "office.tiles", "office.packages", "office.staff", "postman.update",
+                "office.render", "render_ui", "present")
+    # packages alive, stateful tiles on the map and tile events fired on the last tick
+    COUNTERS = ("packages", "tiles", "events")
+
+    def __init__(self, window: int = 600) -> None:
+        self.enabled = False
+        self.window = window
+        self.frames = 0
+        self.samples: dict[str, deque[float]] = {name: deque(maxlen=window) for name in self.SECTIONS}
+        self.counters: dict[str, int] = {name: 0 for name in self.COUNTERS}
+        self._frame: dict[str, float] = {}
+        self._trace = None
+        self._trace_csv = False
+
+    def section(self, name: str) -> contextlib.AbstractContextManager:
+        if not self.enabled:
+            return NULL_SECTION
+        return ProfilerSection(self, name)
+
+    def count(self, name: str, value: int) -> None:
+        if self.enabled:
+            self.counters[name] = value
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        for name in self.SECTIONS:
+            self.samples[name].append(self._frame.get(name, 0))
+        if self._trace != None:
+            self._write_frame()
+        self._frame = {}
+        self.frames += 1
+
+    def percentiles(self, name: str) -> tuple[float, float, float]:
+        ordered = sorted(self.samples[name])
+        return (percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99))
+
+    def summary(self) -> dict:
+        return {
+            "frames": self.frames,
+            "sections": {name: dict(zip(("p50", "p95", "p99"), self.percentiles(name))) for name in self.SECTIONS},
+            "counters": dict(self.counters),
+            "assets": ASSETS.stats,
+        }
+
+    def report(self) -> list[str]:
+        lines = [f"{'section':<16}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for name in self.SECTIONS:
+            p50, p95, p99 = self.percentiles(name)
+            lines.append(f"{name:<16}{p50:>8.3f}{p95:>8.3f}{p99:>8.3f}")
+        lines.append(" ".join(f"{name}: {value}" for name, value in self.counters.items()))
+        assets = ASSETS.stats
+        lines.append(f"assets hits: {assets['hits']} misses: {assets['misses']}")
+        return lines
+
+    def open_trace(self, path: str) -> None:
+        """csv when the path ends in .csv, otherwise one json object per frame"""
+        self._trace = open(path, "w")
+        self._trace_csv = path.endswith(".csv")
+        if self._trace_csv:
+            self._trace.write(",".join(("frame",) + self.SECTIONS + self.COUNTERS) + "\n")
+
+    def close_trace(self) -> None:
+        if self._trace == None:
+            return
+        if not self._trace_csv:
+            self._trace.write(json.dumps({"summary": self.summary()}) + "\n")
+        self._trace.close()
+        self._trace = None
+
+    def _write_frame(self) -> None:
+        assert self._trace != None
+        if self._trace_csv:
+            row = [str(self.frames)] + [f"{self._frame.get(name, 0):.4f}" for name in self.SECTIONS]
+            row += [str(self.counters[name]) for name in self.COUNTERS]
+            self._trace.write(",".join(row) + "\n")
+        else:
+            self._trace.write(json.dumps({"frame": self.frames, "ms": self._frame, "counters": self.counters}) + "\n")
+
+PROFILER = Profiler()
+
+class StartupTimeline:
+    """wall clock milestones from the first import to the first presented frame, each one recorded once"""
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.marks: dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter()
+
+    def phases(self) -> dict[str, float]:
+        """milliseconds every milestone took after the one before it"""
+        phases = {}
+        previous = self.start
+        for name, at in self.marks.items():
+            phases[name] = (at - previous) * 1000
+            previous = at
+        return phases
+
+    def report(self) -> str:
+        phases = self.phases()
+        total = sum(phases.values())
+        return "startup: " + ", ".join(f"{name} {ms:.1f}ms" for name, ms in phases.items()) + f", total {total:.1f}ms"
+
+STARTUP = StartupTimeline(IMPORT_START)
+
+class KeyState(Protocol):
+    def __getitem__(self, key: int) -> bool:
+        ...
+
+class InputSource(Protocol):
+    def get_pressed(self) -> KeyState:
+        ...
+
+class KeyboardInput:
+    def advance(self) -> None:
+        pass
+
+    def get_pressed(self) -> KeyState:
+        return pygame.key.get_pressed()
+
+class PressedKeys:
+    def __init__(self, keys: set[int]) -> None:
+        self.keys = keys
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self.keys
+
+class ScriptedInput:
+    """input fed from a tick -> pressed keys script, or set programmatically"""
+    KEY_NAMES = {
+        'w': pygame.K_w,
+        'a': pygame.K_a,
+        's': pygame.K_s,
+        'd': pygame.K_d,
+        'e': pygame.K_e,
+    }
+
+    def __init__(self, script: dict[int, set[int]] | None = None) -> None:
+        self.script = script if script != None else {}
+        self.pressed: set[int] = set()
+        self.tick = 0
+
+    @classmethod
+    def from_string(cls, script: str) -> ScriptedInput:
+        """parses 'tick:keys,...', i.e '0:d,120:de,240:' holds d from tick 0 and releases everything at 240"""
+        parsed: dict[int, set[int]] = {}
+        for entry in filter(None, script.split(',')):
+            tick, keys = entry.split(':')
+            parsed[int(tick)] = {cls.KEY_NAMES[key] for key in keys.strip().lower()}
+        return cls(parsed)
+
+    def press(self, key: int) -> None:
+        self.pressed.add(key)
+
+    def release(self, key: int) -> None:
+        self.pressed.discard(key)
+
+    def advance(self) -> None:
+        if self.tick in self.script:
+            self.pressed = set(self.script[self.tick])
+        self.tick += 1
+
+    def get_pressed(self) -> KeyState:
+        return PressedKeys(self.pressed)
+
+class TickInput(InputSource, Protocol):
+    def advance(self) -> None:
+        ...
+
+# keys the postman reads, in the order of their bit in a recorded key mask
+RECORDED_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_e)
+REPLAY_MAGIC = b"LD53"
+REPLAY_VERSION = 1
+# magic, version, level, seed, milliseconds per tick
+REPLAY_HEADER = struct.Struct("<4sBBqd")
+# key mask, number of consecutive ticks it was held for
+REPLAY_RUN = struct.Struct("<BH")
+REPLAY_CHUNK = 4096
+
+def key_mask(keys: KeyState) -> int:
+    mask = 0
+    for bit, key in enumerate(RECORDED_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+def keys_from_mask(mask: int) -> set[int]:
+    return {key for bit, key in enumerate(RECORDED_KEYS) if mask & (1 << bit)}
+
+SNAPSHOT_MAGIC = b"LD5S"
+SNAPSHOT_VERSION = 2
+# magic, version, ticks, scheduler clock, timer sequence, packages delivered, animation groups, timers, packages,
+# postmen, level path length.
+# the fixed size sections come first and the packages last, so consecutive snapshots line up byte for byte
+SNAPSHOT_HEADER = struct.Struct("<4sHQdQQIIIHH")
+# one per postman, the player first.
+# pos, prev pos, velocity, acceleration, interact delta, index of the package held or -1, of the package claimed or -1
+SNAPSHOT_POSTMAN = struct.Struct("<8dii")
+# mersenne twister state words, whether a gaussian is pending, the pending gaussian
+SNAPSHOT_RNG = struct.Struct("<625I?d")
+# frame of one animation group
+SNAPSHOT_GROUP = struct.Struct("<H")
+# due time, sequence, TileEvent.value, map cell of the tile or -1 - index of the animation group
+SNAPSHOT_TIMER = struct.Struct("<dQBi")
+# pos, prev pos, speed, Direction.value, PackageVariation.value, flags
+SNAPSHOT_PACKAGE = struct.Struct("<5dBBB")
+SNAPSHOT_ON_CONVEYOR = 1
+SNAPSHOT_AT_END = 2
+SNAPSHOT_BEING_HELD = 4
+# length of the snapshot a delta rebuilds
+SNAPSHOT_DELTA = struct.Struct("<I")
+
+def snapshot_level(data: bytes) -> str:
+    """path of the level a snapshot was taken in"""
+    *_, level_length = SNAPSHOT_HEADER.unpack_from(data)
+    return data[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + level_length].decode("utf-8")
+
+def snapshot_ticks(data: bytes) -> int:
+    """tick a snapshot was taken on"""
+    _, _, ticks, *_ = SNAPSHOT_HEADER.unpack_from(data)
+    return ticks
+
+def snapshot_postmen(data: bytes) -> int:
+    """postmen in the office a snapshot was taken of, the player included"""
+    *_, postmen, _ = SNAPSHOT_HEADER.unpack_from(data)
+    return postmen
+
+def write_snapshot(path: str, data: bytes) -> None:
+    # written aside and renamed, so a crash mid write leaves the previous snapshot intact
+    partial = f"{path}.{os.getpid()}"
+    with open(partial, "wb") as file:
+        file.write(data)
+    os.replace(partial, path)
+
+def read_snapshot(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+def diff_snapshots(base: bytes, snapshot: bytes) -> bytes:
+    """xors a snapshot against an earlier one and deflates it, whatever did not change comes out as long runs of zeroes"""
+    base = base[:len(snapshot)].ljust(len(snapshot), b"\0")
+    xored = int.from_bytes(base, "little") ^ int.from_bytes(snapshot, "little")
+    return SNAPSHOT_DELTA.pack(len(snapshot)) + zlib.compress(xored.to_bytes(len(snapshot), "little"), 1)
+
+def patch_snapshot(base: bytes, delta: bytes) -> bytes:
+    (size,) = SNAPSHOT_DELTA.unpack_from(delta)
+    xored = zlib.decompress(delta[SNAPSHOT_DELTA.size:])
+    base = base[:size].ljust(size, b"\0")
+    return (int.from_bytes(base, "little") ^ int.from_bytes(xored, "little")).to_bytes(size, "little")
+
+class SnapshotHistory:
+    """
+    the last `capacity` snapshots, for rewinding. only every `keyframe_interval`-th one is kept
+    whole, the others as a delta against the snapshot before them.
+    """
+    def __init__(self, capacity: int = 60, keyframe_interval: int = 10) -> None:
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        # (is a keyframe, snapshot or delta), the oldest entry is always a keyframe
+        self._entries: deque[tuple[bool, bytes]] = deque()
+        self._latest: bytes | None = None
+        self._since_keyframe = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(data) for _, data in self._entries)
+
+    @property
+    def latest(self) -> bytes | None:
+        return self._latest
+
+    def push(self, snapshot: bytes) -> None:
+        if self._latest == None or self._since_keyframe + 1 >= self.keyframe_interval:
+            self._entries.append((True, snapshot))
+            self._since_keyframe = 0
+        else:
+            self._entries.append((False, diff_snapshots(self._latest, snapshot)))
+            self._since_keyframe += 1
+        self._latest = snapshot
+
+        if len(self._entries) > self.capacity:
+            _, oldest = self._entries.popleft()
+            keyframe, data = self._entries[0]
+            if not keyframe:
+                self._entries[0] = (True, patch_snapshot(oldest, data))
+
+    def rewind(self, steps: int = 1) -> bytes | None:
+        """drops the newest `steps` snapshots, but never the oldest, and returns the one that is newest after that"""
+        if not self._entries:
+            return None
+        for _ in range(min(steps, len(self._entries) - 1)):
+            self._entries.pop()
+
+        snapshot = b""
+        self._since_keyframe = 0
+        for keyframe, data in self._entries:
+            if keyframe:
+                snapshot = data
+                self._since_keyframe = 0
+            else:
+                snapshot = patch_snapshot(snapshot, data)
+                self._since_keyframe += 1
+        self._latest = snapshot
+        return snapshot
+
+class InputRecorder:
+    """
+    wraps another input source and writes the keys it reports every tick to a replay file.
+    ticks are run-length encoded, so a postman standing still costs nothing.
+    """
+    def __init__(self, source: TickInput, path: str, level: Level, seed: int, dt: float) -> None:
+        self.source = source
+        self.file = open(path, "wb")
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, level.value, seed, dt))
+        self._mask = -1
+        self._run = 0
+
+    def advance(self) -> None:
+        self.source.advance()
+
+    def get_pressed(self) -> KeyState:
+        keys = self.source.get_pressed()
+        self._record(key_mask(keys))
+        return keys
+
+    def _record(self, mask: int) -> None:
+        if mask == self._mask and self._run < 0xFFFF:
+            self._run += 1
+            return
+        self._flush()
+        self._mask = mask
+        self._run = 1
+
+    def _flush(self) -> None:
+        if self._run:
+            self.file.write(REPLAY_RUN.pack(self._mask, self._run))
+
+    def close(self) -> None:
+        self._flush()
+        self._run = 0
+        self.file.close()
+
+class ReplayInput:
+    """streams a recorded replay back one tick at a time, without loading the whole file"""
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        magic, version, level, seed, dt = REPLAY_HEADER.unpack(self.file.read(REPLAY_HEADER.size))
+        assert magic == REPLAY_MAGIC, f"{path} is not a replay"
+        assert version == REPLAY_VERSION, f"unsupported replay version {version}"
+        self.level = Level(level)
+        self.seed = seed
+        self.dt = dt
+        self.pressed: set[int] = set()
+        self.finished = False
+        self._ticks = self._read_ticks()
+        # read one tick ahead, so the end of the stream is known before the game steps into it
+        self._next = next(self._ticks, None)
+
+    def _read_ticks(self):
+        while True:
+            chunk = self.file.read(REPLAY_RUN.size * REPLAY_CHUNK)
+            if not chunk:
+                return
+            for mask, run in REPLAY_RUN.iter_unpack(chunk):
+                keys = keys_from_mask(mask)
+                for _ in range(run):
+                    yield keys
+
+    @property
+    def exhausted(self) -> bool:
+        """no recorded ticks are left to advance into"""
+        return self._next == None
+
+    def advance(self) -> None:
+        keys = self._next
+        if keys == None:
+            self.finished = True
+            self.pressed = set()
+            self.file.close()
+        else:
+            self.pressed = keys
+            self._next = next(self._ticks, None)
+
+    def get_pressed(self) -> KeyState:
+        return PressedKeys(self.pressed)
 
 class Postman:
     def __init__(self, pos: tuple[int | float, int | float]) -> None:
         self.pos: Vec2 = Vec2.from_tuple(pos)
+        # where the postman was before the last tick, rendering interpolates between the two
+        self.prev_pos: Vec2 = self.pos.copy()
         self.velocity: Vec2 = Vec2(0,0)
+        # reused by _handle_inputs every tick
+        self._delta: Vec2 = Vec2(0,0)
         self.acceleration = 0
         self.max_velocity = 3
         self.base_acceleration = 1
-        self.speed = 1.4
-        self.sprite = pygame.image.load("assets/player.png").convert_alpha()
-        self.colissions: list[Tile] | None = None
+        # acceleration gained per second of walking, from a standstill to full speed in about 80ms
+        self.ramp_up = 34
+        # pixels per second at an acceleration of 1, what 1.4 pixels per millisecond of a 60 Hz tick came to
+        self.speed = 1.4 * 1000 / 60
+        self.sprite = ASSETS.image("assets/player.png")
+        self.area = ATLAS.image("assets/player.png")
+        self.input: TickInput = KeyboardInput()
+        # solid cells around the postman, refreshed by the office every tick
+        self.colissions: list[pygame.Rect] | None = None
         self.range = INTERACT_RANGE
         self.nearest_interactable: None | Interactable = None
         self.currently_holding: None | Interactable = None
@@ -181,8 +980,8 @@ class Postman:
         if self.nearest_interactable == None:
             return False
 
-        distance = self.nearest_interactable.pos - self.pos
-        if distance.magnitude() < self.range:
+        pos = self.nearest_interactable.pos
+        if max(pos.x - self.pos.x, pos.y - self.pos.y) < self.range:
             return True
         else:
             return False
@@ -193,7 +992,10 @@ class Postman:
 
     @property
     def coliding(self) -> bool:
-        return any([self.get_rect().colliderect(tile.get_rect()) for tile in self.colissions]) if self.colissions != None else False
+        if not self.colissions:
+            return False
+        rect = self.get_rect()
+        return rect.collidelist(self.colissions) != -1
 
     def interact(self) -> None:
         self.interact_delta -= .1
@@ -216,6 +1018,7 @@ class Postman:
         return rect
 
     def update(self, dt: float) -> None:
+        self.prev_pos.set_from(self.pos)
         delta = self._handle_inputs(dt)
         if self.interact_delta < 0:
             self.interact_delta = INTERACT_INTERVAL
@@ -223,26 +1026,79 @@ class Postman:
         elif self.interact_delta != INTERACT_INTERVAL:
             self.interact_delta -= dt/1000
 
-        if not self.colissions:
-            self.pos = self.pos + delta
-            return
-
-        start_pos = self.pos.copy()
+        # an empty colissions list only means nothing solid is close, weight and the held package still apply
+        start_x, start_y = self.pos.x, self.pos.y
 
         speed_modifier = self._get_speed_modifier()
         self.pos.x = self.pos.x + delta.x *speed_modifier
-        if self.coliding:
-            self.pos.x = start_pos.x
+        if self.coliding and not self._clear_corner(horizontal=True):
+            self.pos.x = self._contact(start_x, horizontal=True)
 
         self.pos.y = self.pos.y + delta.y * speed_modifier
-        if self.coliding:
-            self.pos.y = start_pos.y
+        if self.coliding and not self._clear_corner(horizontal=False):
+            self.pos.y = self._contact(start_y, horizontal=False)
 
         if self.currently_holding != None:
-            self.currently_holding.pos = self.pos.copy()
+            self.currently_holding.move_to(self.pos)
+
+    def _contact(self, start: float, horizontal: bool) -> float:
+        """where the move from `start` meets the first wall, or `start` when it can not get any closer"""
+        assert self.colissions
+        rect = self.get_rect()
+        hits = [self.colissions[i] for i in rect.collidelistall(self.colissions)]
+        if horizontal:
+            moved = self.pos.x
+            contact = max(hit.right for hit in hits) if moved < start else min(hit.left for hit in hits) - rect.width
+        else:
+            moved = self.pos.y
+            contact = max(hit.bottom for hit in hits) if moved < start else min(hit.top for hit in hits) - rect.height
+        if not min(start, moved) <= contact <= max(start, moved):
+            return start
+        if horizontal:
+            self.pos.x = contact
+        else:
+            self.pos.y = contact
+        return start if self.coliding else contact
+
+    def _clear_corner(self, horizontal: bool) -> bool:
+        """
+        pushes the postman across the way it walks when it only clips walls by a few pixels,
+        so walking into a corridor does not take pixel exact aim. returns whether that freed it
+        """
+        assert self.colissions
+        rect = self.get_rect()
+        nudges = set()
+        for hit in (self.colissions[i] for i in rect.collidelistall(self.colissions)):
+            if horizontal:
+                nudges.add(hit.bottom - rect.top if hit.centery < rect.centery else hit.top - rect.bottom)
+            else:
+                nudges.add(hit.right - rect.left if hit.centerx < rect.centerx else hit.left - rect.right)
+        if len(nudges) != 1:
+            return False
+        nudge = nudges.pop()
+        if abs(nudge) > CORNER_NUDGE:
+            return False
+        if horizontal:
+            self.pos.y += nudge
+        else:
+            self.pos.x += nudge
+        if self.coliding:
+            if horizontal:
+                self.pos.y -= nudge
+            else:
+                self.pos.x -= nudge
+            return False
+        return True
 
-    def render(self, surf: pygame.Surface) -> None:
-        surf.blit(self.sprite, (self.pos.x,self.pos.y))
+    def render(self, surf: pygame.Surface, alpha: float = 1, offset: tuple[int, int] = (0, 0)) -> None:
+        surf.blit(ATLAS.surface, self.render_rect(alpha).move(-offset[0], -offset[1]), self.area)
+
+    def render_rect(self, alpha: float = 1) -> pygame.Rect:
+        pos = self.prev_pos.lerp(self.pos, alpha)
+        rect = self.sprite.get_rect()
+        rect.x = int(pos.x)
+        rect.y = int(pos.y)
+        return rect
 
     def _get_speed_modifier(self) -> float:
         if self.currently_holding:
@@ -250,151 +1106,1200 @@ class Postman:
         return 1
 
     def _handle_inputs(self, dt: float) -> Vec2:
-        keys = pygame.key.get_pressed()
+        keys = self.input.get_pressed()
         normalized_dt = dt/1000
 
 
         if keys[pygame.K_e] and not self.interact_on_cooldown:
             self.interact()
 
+        # everything below is per second, so the distance walked does not depend on the tick rate
         if keys[pygame.K_w]:
-            self.velocity.y =- self.acceleration * normalized_dt
+            self.velocity.y = -self.acceleration
 
         elif keys[pygame.K_s]:
-            self.velocity.y =+ self.acceleration * normalized_dt
+            self.velocity.y = self.acceleration
         else:
             self.velocity.y = 0
 
         if keys[pygame.K_a]:
-            self.velocity.x =- self.acceleration * normalized_dt
+            self.velocity.x = -self.acceleration
 
         elif keys[pygame.K_d]:
-            self.velocity.x =+ self.acceleration * normalized_dt
+            self.velocity.x = self.acceleration
         else:
             self.velocity.x = 0
 
         if self.velocity.x or self.velocity.y:
-            self.acceleration *= dt / 10
+            self.acceleration += self.ramp_up * normalized_dt
             if self.acceleration >= self.max_velocity:
                 self.acceleration = self.max_velocity
         else:
             self.acceleration = self.base_acceleration / 4
 
-        return Vec2(self.velocity.x * self.speed * dt, self.velocity.y * self.speed * dt)
+        return self._delta.set(self.velocity.x * self.speed * normalized_dt, self.velocity.y * self.speed * normalized_dt)
 
 class Level(enum.IntEnum):
     test  = 0
     one   = enum.auto()
     two   = enum.auto()
 
-class Office:
-    def __init__(self, size: int) -> None:
-        self.packages_delivered: int = 0
-        self.size = size
-        self._map_data: list[list[Tile]] = [[]]
-        self._player: None | Postman = None
-        self.packages: list[Package] = []
-        self.drop_of_tile: Tile | None = None
-
-    def generate_map(self, level: Level) -> None:
-        data = self._load_map(level)
-        for y in range(0, len(data)):
-            row = []
-            for x, char in enumerate(data[y]):
-                pos = (x * SIZE, y * SIZE)
-                if char == '#':
-                    row.append(Tile(TileType.wall, pos))
-
-                elif char == '¤':
-                    row.append(Tile(TileType.wall_full, pos))
+LEVEL_MAGIC = b"LD5L"
+LEVEL_VERSION = 2
+LEVEL_CACHE_DIR = "levels/.cache"
+# magic, version, width, height, player start x/y, drop of count, spawner count; -1 marks a missing position
+LEVEL_HEADER = struct.Struct("<4sHIIiiII")
+# x, y
+LEVEL_DROP_OF = struct.Struct("<II")
+# x, y, Direction.value
+LEVEL_SPAWNER = struct.Struct("<IIB")
+
+def level_path(level: Level | str) -> str:
+    return level if isinstance(level, str) else 'levels/level-'+ str(level.value)
+
+class CompiledLevel:
+    """a level as a flat row major array of TileType values, plus what the grid can not hold"""
+    def __init__(self, width: int, height: int, tiles: array, player_start: tuple[int, int] | None,
+                 drop_ofs: list[tuple[int, int]], spawners: list[tuple[int, int, Direction]]) -> None:
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+        self.player_start = player_start
+        self.drop_ofs = drop_ofs
+        self.spawners = spawners
+
+    def to_bytes(self) -> bytes:
+        player = self.player_start if self.player_start != None else (-1, -1)
+        header = LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, self.width, self.height,
+                                   player[0], player[1], len(self.drop_ofs), len(self.spawners))
+        drop_ofs = b"".join(LEVEL_DROP_OF.pack(x, y) for x, y in self.drop_ofs)
+        spawners = b"".join(LEVEL_SPAWNER.pack(x, y, direction.value) for x, y, direction in self.spawners)
+        return header + drop_ofs + spawners + self.tiles.tobytes()
 
-                elif char == '-':
-                    row.append(Tile(TileType.conveyor, pos))
-
-                elif char == '-e':
-                    row.append(Tile(TileType.conveyorend, pos))
+    @classmethod
+    def from_bytes(cls, data: bytes) -> CompiledLevel:
+        magic, version, width, height, px, py, drop_of_count, spawner_count = LEVEL_HEADER.unpack_from(data)
+        assert magic == LEVEL_MAGIC, "not a compiled level"
+        assert version == LEVEL_VERSION, f"unsupported compiled level version {version}"
+        offset = LEVEL_HEADER.size
+        drop_ofs = [(x, y) for x, y in LEVEL_DROP_OF.iter_unpack(data[offset:offset + drop_of_count * LEVEL_DROP_OF.size])]
+        offset += drop_of_count * LEVEL_DROP_OF.size
+        spawners = []
+        for x, y, direction in LEVEL_SPAWNER.iter_unpack(data[offset:offset + spawner_count * LEVEL_SPAWNER.size]):
+            spawners.append((x, y, Direction(direction)))
+        offset += spawner_count * LEVEL_SPAWNER.size
+
+        tiles = array("B")
+        tiles.frombytes(data[offset:offset + width * height])
+        return cls(width, height, tiles,
+                   (px, py) if px >= 0 else None,
+                   drop_ofs,
+                   spawners)
+
+def compile_level(source: str) -> CompiledLevel:
+    """parses the comma separated text format"""
+    # tokens that are not listed are floor
+    tile_ids = {
+        '#': TileType.wall.value,
+        '¤': TileType.wall_full.value,
+        '-': TileType.conveyor.value,
+        '-e': TileType.conveyorend.value,
+        't': TileType.stamper.value,
+        '+': TileType.package_spawner.value,
+        'x': TileType.drop_of.value,
+    }
+    floor = TileType.floor.value
+
+    rows = [line.split(',') for line in source.split('\n') if line]
+    assert rows, "map data is empty"
+    width = len(rows[0])
+    tiles = array("B")
+    player_start = None
+    drop_ofs = []
+    spawners = []
+    for y, row in enumerate(rows):
+        assert len(row) == width, "map rows are not all the same width"
+        for x, char in enumerate(row):
+            tiles.append(tile_ids.get(char, floor))
+            if char == '+':
+                spawners.append((x, y, Direction.left))
+            elif char == 'X':
+                player_start = (x, y)
+            elif char == 'x':
+                drop_ofs.append((x, y))
+
+    return CompiledLevel(width, len(rows), tiles, player_start, drop_ofs, spawners)
+
+def load_level(path: str, cache_dir: str = LEVEL_CACHE_DIR) -> CompiledLevel:
+    """
+    compiled level for a level file, the compile is cached on disk by a hash of the source.
+    files that are already compiled, see CompiledLevel.to_bytes, are read as they are.
+    """
+    with open(path, "rb") as file:
+        source = file.read()
+    if source.startswith(LEVEL_MAGIC):
+        return CompiledLevel.from_bytes(source)
+    digest = hashlib.sha1(source + bytes([LEVEL_VERSION])).hexdigest()
+    cached = os.path.join(cache_dir, digest)
+
+    if os.path.exists(cached):
+        with open(cached, "rb") as file:
+            return CompiledLevel.from_bytes(file.read())
+
+    level = compile_level(source.decode("utf-8"))
+    os.makedirs(cache_dir, exist_ok=True)
+    # written aside and renamed so a concurrent reader never sees half a file
+    partial = f"{cached}.{os.getpid()}"
+    with open(partial, "wb") as file:
+        file.write(level.to_bytes())
+    os.replace(partial, cached)
+    return level
+
+def compile_levels(directory: str = "levels") -> None:
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        start = time.perf_counter()
+        level = load_level(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{path}: {level.width}x{level.height}, {len(level.spawners)} spawners, {elapsed:.1f}ms")
+
+class FlowField:
+    """
+    the belts as a graph, built once per map. every belt cell knows the direction a package
+    on it moves in, the cell it moves to, how many cells are left to the nearest end and
+    which end that is, found with a breadth first search backwards from every conveyor end.
+    """
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        cells = width * height
+        # -1 off the belts
+        self.next = array("i", [-1]) * cells
+        self.distance = array("i", [-1]) * cells
+        self.end = array("i", [-1]) * cells
+        # Direction.value, 0 off the belts and on the ends themselves
+        self.direction = array("B", [0]) * cells
 
-                elif char == 't':
-                    row.append(Tile(TileType.stamper, pos))
+    @classmethod
+    def from_level(cls, level: CompiledLevel) -> FlowField:
+        field = cls(level.width, level.height)
+        belts = {TileType.conveyor.value, TileType.conveyorend.value, TileType.package_spawner.value}
+        width, height = level.width, level.height
+        neighbours = [(direction.value, dx, dy) for direction, (dx, dy) in DIRECTION_VECTORS.items()]
+
+        # searching the raw bytes for the ends beats a python loop over every cell on large maps
+        tiles = level.tiles.tobytes()
+        end = bytes((TileType.conveyorend.value,))
+        queue: deque[int] = deque()
+        i = tiles.find(end)
+        while i != -1:
+            field.distance[i] = 0
+            field.end[i] = i
+            field.next[i] = i
+            queue.append(i)
+            i = tiles.find(end, i + 1)
+
+        while queue:
+            cell = queue.popleft()
+            x, y = cell % width, cell // width
+            for direction, dx, dy in neighbours:
+                # the neighbour that would move onto this cell going `direction`
+                nx, ny = x - dx, y - dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbour = ny * width + nx
+                if field.distance[neighbour] != -1 or tiles[neighbour] not in belts:
+                    continue
+                field.distance[neighbour] = field.distance[cell] + 1
+                field.end[neighbour] = field.end[cell]
+                field.next[neighbour] = cell
+                field.direction[neighbour] = direction
+                queue.append(neighbour)
+        return field
+
+    def cell_at(self, x: float, y: float) -> int:
+        cx, cy = int(x // SIZE), int(y // SIZE)
+        if 0 <= cx < self.width and 0 <= cy < self.height:
+            return cy * self.width + cx
+        return -1
+
+    def direction_at(self, x: int, y: int) -> Direction | None:
+        value = self.direction[y * self.width + x]
+        return DIRECTION_BY_VALUE[value] if value else None
+
+    def follow(self, pos: Vec2, direction: Direction) -> tuple[Direction, bool]:
+        """
+        the direction a package at `pos` should keep moving in and whether its front edge is on an end.
+        a package only turns once it sits squarely on the turning cell, and is snapped onto it, so it keeps its lane.
+        """
+        dx, dy = DIRECTION_VECTORS[direction]
+        half = SIZE / 2
+        front = self.cell_at(pos.x + half + dx * half - (dx > 0), pos.y + half + dy * half - (dy > 0))
+        if front != -1 and self.distance[front] == 0:
+            return direction, True
+
+        cell = self.cell_at(pos.x + half, pos.y + half)
+        if cell == -1 or not self.direction[cell]:
+            # off the routed belts, a package keeps going the way it was
+            return direction, False
+        turn = DIRECTION_BY_VALUE[self.direction[cell]]
+        if turn is direction:
+            return direction, False
+
+        x, y = cell % self.width * SIZE, cell // self.width * SIZE
+        if (pos.x - x) * dx + (pos.y - y) * dy < 0:
+            return direction, False
+        pos.x, pos.y = x, y
+        return turn, False
+
+    def capacity(self) -> dict[tuple[int, int], int]:
+        """how many packages the belts draining into each end hold when full, one per cell"""
+        cells: dict[tuple[int, int], int] = {}
+        for end in self.end:
+            if end != -1:
+                key = (end % self.width, end // self.width)
+                cells[key] = cells.get(key, 0) + 1
+        return cells
+
+class SpatialGrid:
+    """
+    uniform grid over the map keyed on tile cells.
+    tiles never move, packages are bucketed by the cell of their top left corner
+    and rebucketed through `move` whenever they cross into another cell.
+    """
+    def __init__(self, cell_size: int, tiles: ChunkedMap) -> None:
+        self.cell_size = cell_size
+        self.tiles = tiles
+        # buckets are dicts rather than sets so iterating them is deterministic
+        self._packages: dict[tuple[int, int], dict[Package, None]] = {}
+        self._package_cells: dict[Package, tuple[int, int]] = {}
+
+    def cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def add_package(self, package: Package) -> None:
+        cell = self.cell_of(package.pos.x, package.pos.y)
+        self._package_cells[package] = cell
+        self._packages.setdefault(cell, {})[package] = None
+
+    def remove_package(self, package: Package) -> None:
+        cell = self._package_cells.pop(package)
+        bucket = self._packages[cell]
+        del bucket[package]
+        if not bucket:
+            del self._packages[cell]
+
+    def move(self, package: Package) -> None:
+        cell = self.cell_of(package.pos.x, package.pos.y)
+        if self._package_cells.get(package) == cell:
+            return
+        if package in self._package_cells:
+            self.remove_package(package)
+        self.add_package(package)
+
+    def _cells_near(self, rect: pygame.Rect) -> tuple[range, range]:
+        """columns and rows of the map cells the rect overlaps"""
+        left, top = self.cell_of(rect.left, rect.top)
+        right, bottom = self.cell_of(rect.right - 1, rect.bottom - 1)
+        return (range(max(left, 0), min(right + 1, self.tiles.width)),
+                range(max(top, 0), min(bottom + 1, self.tiles.height)))
+
+    def tiles_near(self, rect: pygame.Rect) -> list[Tile]:
+        """every stateful tile whose cell overlaps the rect"""
+        columns, rows = self._cells_near(rect)
+        tiles = self.tiles.tiles
+        width = self.tiles.width
+        return [tiles[y * width + x] for y in rows for x in columns if y * width + x in tiles]
+
+    def solid_tiles_near(self, rect: pygame.Rect) -> list[pygame.Rect]:
+        """the rects of every cell the rect overlaps that can not be walked through"""
+        columns, rows = self._cells_near(rect)
+        walkable = self.tiles.walkable_cells
+        width = self.tiles.width
+        size = self.cell_size
+        return [pygame.Rect(x * size, y * size, size, size) for y in rows for x in columns if not walkable[y * width + x]]
+
+    def _walkable_neighbours(self, cell: int):
+        width = self.tiles.width
+        walkable = self.tiles.walkable_cells
+        x, y = cell % width, cell // width
+        if x + 1 < width and walkable[cell + 1]:
+            yield cell + 1
+        if x > 0 and walkable[cell - 1]:
+            yield cell - 1
+        if y + 1 < self.tiles.height and walkable[cell + width]:
+            yield cell + width
+        if y > 0 and walkable[cell - width]:
+            yield cell - width
+
+    def walk_distances(self, goals: Collection[int]) -> array:
+        """cells to walk from every cell to the nearest of `goals`, -1 where none can be reached"""
+        distances = array("i", [-1]) * (self.tiles.width * self.tiles.height)
+        queue: deque[int] = deque()
+        for goal in goals:
+            distances[goal] = 0
+            queue.append(goal)
+        while queue:
+            cell = queue.popleft()
+            for neighbour in self._walkable_neighbours(cell):
+                if distances[neighbour] == -1:
+                    distances[neighbour] = distances[cell] + 1
+                    queue.append(neighbour)
+        return distances
+
+    def route(self, start: int, goals: Collection[int], reach: int) -> list[int] | None:
+        """
+        shortest walk from `start` to any of `goals` as the cells after `start`, over walkable cells
+        and no further than `reach` cells from the start on either axis. None when no goal is in there
+        """
+        if start in goals:
+            return []
+        width = self.tiles.width
+        start_x, start_y = start % width, start // width
+        came_from = {start: start}
+        queue: deque[int] = deque([start])
+        while queue:
+            cell = queue.popleft()
+            for neighbour in self._walkable_neighbours(cell):
+                if neighbour in came_from:
+                    continue
+                if abs(neighbour % width - start_x) > reach or abs(neighbour // width - start_y) > reach:
+                    continue
+                came_from[neighbour] = cell
+                if neighbour in goals:
+                    path = [neighbour]
+                    while came_from[path[-1]] != start:
+                        path.append(came_from[path[-1]])
+                    path.reverse()
+                    return path
+                queue.append(neighbour)
+        return None
+
+    def packages_near(self, rect: pygame.Rect) -> list[Package]:
+        """every package that could overlap the rect, packages are at most one cell wide"""
+        left, top = self.cell_of(rect.left - self.cell_size + 1, rect.top - self.cell_size + 1)
+        right, bottom = self.cell_of(rect.right - 1, rect.bottom - 1)
+        packages = []
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                bucket = self._packages.get((x, y))
+                if bucket:
+                    packages.extend(bucket)
+        return packages
+
+    def nearest_package(self, pos: Vec2, radius: float, free_only: bool = False,
+                        exclude: Collection[Package] = ()) -> Package | None:
+        """`free_only` skips packages somebody is holding, `exclude` packages claimed by someone else"""
+        left, top = self.cell_of(pos.x - radius, pos.y - radius)
+        right, bottom = self.cell_of(pos.x + radius, pos.y + radius)
+        if (right - left + 1) * (bottom - top + 1) > len(self._packages):
+            # a wide search is cheaper over the occupied buckets, kept in the row order of the scan below
+            cells = sorted((cell for cell in self._packages if left <= cell[0] <= right and top <= cell[1] <= bottom),
+                           key=lambda cell: (cell[1], cell[0]))
+        else:
+            cells = [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+        nearest = None
+        nearest_distance = radius
+        for cell in cells:
+            for package in self._packages.get(cell, ()):
+                if free_only and package.being_held:
+                    continue
+                if package in exclude:
+                    continue
+                distance = math.hypot(package.pos.x - pos.x, package.pos.y - pos.y)
+                if distance <= nearest_distance:
+                    nearest = package
+                    nearest_distance = distance
+        return nearest
+
+class TileEvent(enum.Enum):
+    spawn   = enum.auto()
+    animate = enum.auto()
+
+class AnimationGroup:
+    """one clock and frame index shared by every tile drawing the same animated sheet"""
+    def __init__(self, sheet: Spritesheet, interval: float) -> None:
+        self.sheet = sheet
+        self.interval = interval
 
-                elif char == '+':
-                    tile = Tile(TileType.package_spawner, pos)
-                    assert isinstance(tile.behaviour, ConveyorSpawnerBehaviour)
-                    tile.behaviour.direction = Direction.left
-                    row.append(tile)
+    @property
+    def frame(self) -> pygame.Surface:
+        return self.sheet.active
 
-                elif char == 'X':
-                    self._player = Postman(pos)
-                    row.append(Tile(TileType.floor, pos))
+    @property
+    def index(self) -> int:
+        return self.sheet._index
+
+    def on_event(self, event: TileEvent, office: Office) -> float:
+        self.sheet.next()
+        return self.interval
+
+class TileScheduler:
+    """
+    timer heap for tiles with periodic work, plus proximity triggers for tiles reacting to the postman.
+    a tick only touches tiles with an event due, so its cost follows the events and not the map area.
+    """
+    def __init__(self) -> None:
+        self.now: float = 0
+        self._timers: list[tuple[float, int, TileEvent, Tile | AnimationGroup]] = []
+        self._sequence = 0
+        self._triggers: set[Tile] = set()
+        self.animation_groups: dict[str, AnimationGroup] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def schedule(self, target: Tile | AnimationGroup, event: TileEvent, delay: float) -> None:
+        """`delay` in seconds, events fire on the first tick after it has fully passed"""
+        heapq.heappush(self._timers, (self.now + delay * 1000, self._sequence, event, target))
+        self._sequence += 1
+
+    def add_trigger(self, tile: Tile) -> None:
+        self._triggers.add(tile)
+
+    def add_kind(self, kind: TileKind) -> None:
+        """every cell of an animated kind draws its one sheet, so a group per sheet animates all of them"""
+        if kind.behaviour.animated and kind.sheet.path not in self.animation_groups:
+            group = AnimationGroup(kind.sheet, kind.behaviour.animation_interval)
+            self.animation_groups[kind.sheet.path] = group
+            self.schedule(group, TileEvent.animate, group.interval)
+
+    def add_tile(self, tile: Tile) -> None:
+        behaviour = tile.behaviour
+        if isinstance(behaviour, ConveyorSpawnerBehaviour):
+            self.schedule(tile, TileEvent.spawn, behaviour.interval)
+        if tile.type is TileType.stamper:
+            self.add_trigger(tile)
+
+    def advance(self, dt: float, office: Office) -> int:
+        """moves the clock `dt` milliseconds forward, fires every due event and returns how many fired"""
+        self.now += dt
+        fired = 0
+        while self._timers and self._timers[0][0] < self.now:
+            _, _, event, target = heapq.heappop(self._timers)
+            self.schedule(target, event, target.on_event(event, office))
+            fired += 1
+
+        player = office._player
+        if player != None and self._triggers:
+            reach = player.get_rect().inflate(INTERACT_RANGE * 2, INTERACT_RANGE * 2)
+            for tile in office.grid.tiles_near(reach):
+                if tile in self._triggers:
+                    tile.on_player_near(player, office)
+                    fired += 1
+        return fired
+
+class Chunk:
+    """a CHUNK_SIZE x CHUNK_SIZE block of the map, `animated` holds the pixel position and sheet of every cell redrawn every frame"""
+    def __init__(self, cx: int, cy: int, tile_size: int) -> None:
+        self.cx = cx
+        self.cy = cy
+        self.animated: list[tuple[int, int, Spritesheet]] = []
+        span = CHUNK_SIZE * tile_size
+        self.rect = pygame.Rect(cx * span, cy * span, span, span)
+
+class ChunkedMap:
+    """
+    the map as a flat row major buffer of TileType values, every cell of a type shares one TileKind.
+    only cells with state of their own, spawners and stampers, get a Tile in `tiles`, keyed by cell index.
+    the map is split into fixed size chunks, so drawing can be limited to the chunks in view.
+    """
+    def __init__(self, tile_size: int = SIZE) -> None:
+        self.tile_size = tile_size
+        self.width = 0
+        self.height = 0
+        self.types = array("B")
+        # 1 where the cell can be walked through, so a lookup is one index
+        self.walkable_cells = b""
+        self.kinds: dict[int, TileKind] = {}
+        self.tiles: dict[int, Tile] = {}
+        self.chunks: dict[tuple[int, int], Chunk] = {}
 
-                elif char == 'x':
-                    tile = Tile(TileType.drop_of, pos)
-                    self.drop_of_tile = tile
-                    row.append(tile)
+    @classmethod
+    def from_level(cls, level: CompiledLevel, tile_size: int = SIZE) -> ChunkedMap:
+        tiles = cls(tile_size)
+        tiles.width = level.width
+        tiles.height = level.height
+        tiles.types = level.tiles
+
+        present = set(level.tiles)
+        # types drawing the same image share the sheet, so they also share its animation
+        sheets: dict[tuple, Spritesheet] = {}
+        for tile_type in TileType:
+            if tile_type.value in present:
+                path, fill = TILE_SHEETS.get(tile_type, TILE_SHEETS[TileType.floor])
+                sheet = sheets.get((path, fill))
+                if sheet == None:
+                    sheet = sheets[(path, fill)] = Spritesheet(path, fill=fill)
+                behaviour = TILE_BEHAVIOURS.get(tile_type)
+                tiles.kinds[tile_type.value] = TileKind(tile_type, behaviour() if behaviour != None else Behaviour, sheet)
+
+        walkable = bytes(value in tiles.kinds and tiles.kinds[value].behaviour.can_walk_through for value in range(256))
+        tiles.walkable_cells = level.tiles.tobytes().translate(walkable)
+
+        for cy in range((level.height + CHUNK_SIZE - 1) // CHUNK_SIZE):
+            for cx in range((level.width + CHUNK_SIZE - 1) // CHUNK_SIZE):
+                tiles.chunks[(cx, cy)] = Chunk(cx, cy, tile_size)
+
+        animated = {value for value, kind in tiles.kinds.items() if kind.behaviour.animated}
+        stateful = {TileType.package_spawner.value, TileType.stamper.value}
+        cells = []
+        for i, type_id in enumerate(level.tiles):
+            if type_id in animated or type_id in stateful:
+                x, y = i % level.width, i // level.width
+                cells.append((y // CHUNK_SIZE, x // CHUNK_SIZE, y, x, type_id))
+        # chunk by chunk, the order tiles are handed to the scheduler in
+        cells.sort()
+        for cy, cx, y, x, type_id in cells:
+            kind = tiles.kinds[type_id]
+            if type_id in animated:
+                tiles.chunks[(cx, cy)].animated.append((x * tile_size, y * tile_size, kind.sheet))
+            if type_id in stateful:
+                tiles.tiles[y * level.width + x] = Tile(kind, (x * tile_size, y * tile_size))
+        return tiles
 
-                else:
-                    row.append(Tile(TileType.floor, pos))
+    @property
+    def pixel_size(self) -> tuple[int, int]:
+        return (self.width * self.tile_size, self.height * self.tile_size)
+
+    def kind_at(self, x: int, y: int) -> TileKind | None:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.kinds[self.types[y * self.width + x]]
+        return None
+
+    def walkable(self, x: int, y: int) -> bool:
+        """off the map is not"""
+        return 0 <= x < self.width and 0 <= y < self.height and self.walkable_cells[y * self.width + x] == 1
+
+    def get(self, x: int, y: int) -> Tile | None:
+        """the stateful tile on a cell, if it has one"""
+        return self.tiles.get(y * self.width + x)
+
+    def chunk_cells(self, chunk: Chunk) -> list[tuple[int, int, Spritesheet]]:
+        """pixel position and sheet of every cell in the chunk"""
+        span = CHUNK_SIZE
+        size = self.tile_size
+        kinds = self.kinds
+        cells = []
+        for y in range(chunk.cy * span, min((chunk.cy + 1) * span, self.height)):
+            row = y * self.width
+            for x in range(chunk.cx * span, min((chunk.cx + 1) * span, self.width)):
+                cells.append((x * size, y * size, kinds[self.types[row + x]].sheet))
+        return cells
 
+    @property
+    def nbytes(self) -> int:
+        """what the cell buffers take, the chunks and side table aside"""
+        return len(self.types) * self.types.itemsize + len(self.walkable_cells)
+
+    def chunks_in(self, rect: pygame.Rect) -> list[Chunk]:
+        span = CHUNK_SIZE * self.tile_size
+        chunks = []
+        for cy in range(rect.top // span, (rect.bottom - 1) // span + 1):
+            for cx in range(rect.left // span, (rect.right - 1) // span + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk != None:
+                    chunks.append(chunk)
+        return chunks
+
+class ChunkSurfaceCache:
+    """pre-rendered static tiles per chunk, built on first sight and evicted least recently used first"""
+    def __init__(self, max_chunks: int = CHUNK_CACHE_SIZE) -> None:
+        self.max_chunks = max_chunks
+        self._surfaces: OrderedDict[tuple[int, int], pygame.Surface] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def get(self, chunk: Chunk, tiles: ChunkedMap) -> pygame.Surface:
+        key = (chunk.cx, chunk.cy)
+        surface = self._surfaces.get(key)
+        if surface != None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        surface = pygame.Surface(chunk.rect.size)
+        surface.fill(0)
+        surface.blits([(ATLAS.surface, (x - chunk.rect.x, y - chunk.rect.y), sheet.area)
+                       for x, y, sheet in tiles.chunk_cells(chunk)], doreturn=False)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_chunks:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+
+class Camera:
+    """top left of the office view, centred on a target and kept inside the map"""
+    def __init__(self, size: tuple[int, int]) -> None:
+        self.size = size
+        self.x = 0
+        self.y = 0
 
-            self._map_data.append(row)
+    @property
+    def offset(self) -> tuple[int, int]:
+        return (self.x, self.y)
 
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(self.x, self.y, self.size[0], self.size[1])
 
-    def render(self, surf: pygame.Surface) -> None:
-        for column in self._map_data:
-            for tile in column:
-                surf.blit(tile.sheet.active, tile.pos.as_tuple())
+    def follow(self, pos: Vec2, bounds: tuple[int, int]) -> None:
+        x = pos.x + SIZE / 2 - self.size[0] / 2
+        y = pos.y + SIZE / 2 - self.size[1] / 2
+        self.x = int(min(max(x, 0), max(bounds[0] - self.size[0], 0)))
+        self.y = int(min(max(y, 0), max(bounds[1] - self.size[1], 0)))
 
+class Office:
+    def __init__(self, size: int, array_packages: bool = False, cull_simulation: bool = False) -> None:
+        self.packages_delivered: int = 0
+        self.size = size
+        self.map = ChunkedMap(size)
+        self._player: None | Postman = None
+        # every postman in the office, the player first
+        self.postmen: list[Postman] = []
+        # the package each postman is on its way to, nobody else is offered it
+        self.claims: dict[Postman, Interactable] = {}
+        self._start: tuple[int, int] | None = None
+        # walking distance to the nearest drop off from every cell, worked out on first use
+        self._drop_distances: array | None = None
+        self._staff_rects: list[pygame.Rect] = []
+        self.packages: list[Package] = []
+        # (text, map position) hints raised by tiles this tick, drawn over the office
+        self.prompts: list[tuple[str, tuple[int, int]]] = []
+        self._prompt_rects: list[pygame.Rect] = []
+        self.package_pool = PackagePool()
+        self.drop_of_tiles: list[Tile] = []
+        self.camera = Camera(VIEW_DIMENSION)
+        self.chunk_surfaces = ChunkSurfaceCache()
+        # when set, packages and spawners far from the view and from every postman are paused.
+        # only the window turns it on, headless runs always simulate the whole map
+        self.cull_simulation = cull_simulation
+        self._active: list[pygame.Rect] = []
+        self._background: pygame.Surface | None = None
+        self._background_offset: tuple[int, int] | None = None
+        self._animation_frames: dict[AnimationGroup, int] = {}
+        self._package_rects: dict[Package, pygame.Rect] = {}
+        self.grid = SpatialGrid(size, self.map)
+        self.level_path: str | None = None
+        self.flow = FlowField(0, 0)
+        self.scheduler = TileScheduler()
+        # packages live in numpy columns instead of Package objects when set
+        self.package_store: PackageStore | None = PackageStore() if array_packages else None
+
+    def generate_map(self, level: Level | str) -> None:
+        """`level` is either one of the bundled levels or a path to a level file"""
+        self.level_path = level_path(level)
+        compiled = load_level(self.level_path)
+        self.map = ChunkedMap.from_level(compiled, self.size)
+        self.flow = FlowField.from_level(compiled)
+        directions = {(x, y): direction for x, y, direction in compiled.spawners}
+        for tile in self.map.tiles.values():
+            if tile.type is TileType.package_spawner:
+                assert isinstance(tile.behaviour, ConveyorSpawnerBehaviour)
+                x, y = int(tile.pos.x) // self.size, int(tile.pos.y) // self.size
+                # the belt it sits on knows better than the level, which only has one spawner direction
+                tile.behaviour.direction = self.flow.direction_at(x, y) or directions[(x, y)]
+
+        self.drop_of_tiles = []
+        self._drop_distances = None
+        for x, y in compiled.drop_ofs:
+            kind = self.map.kind_at(x, y)
+            assert kind != None
+            self.drop_of_tiles.append(Tile(kind, (x * self.size, y * self.size)))
+
+        if compiled.player_start != None:
+            x, y = compiled.player_start
+            self._start = (x * SIZE, y * SIZE)
+            self._player = Postman(self._start)
+            self.postmen = [self._player]
+            self.claims = {}
+
+        self.grid = SpatialGrid(self.size, self.map)
+        self.scheduler = TileScheduler()
+        for kind in self.map.kinds.values():
+            self.scheduler.add_kind(kind)
+        for tile in self.map.tiles.values():
+            self.scheduler.add_tile(tile)
         for package in self.packages:
-            surf.blit(package.surf, package.pos.as_tuple())
+            self.grid.add_package(package)
+        if self.package_store != None:
+            self.package_store.set_flow(self.flow)
+        self.chunk_surfaces.clear()
+        self._background = None
+        if self._player != None:
+            self.camera.follow(self._player.pos, self.map.pixel_size)
+        self._active = self.active_rects()
+
+    def add_package(self, package: Package) -> None:
+        package.index = len(self.packages)
+        self.packages.append(package)
+        self.grid.add_package(package)
+
+    def remove_package(self, package: Package) -> None:
+        """swaps the last package into the removed one's place instead of shifting the list"""
+        last = self.packages.pop()
+        if last is not package:
+            self.packages[package.index] = last
+            last.index = package.index
+        self.grid.remove_package(package)
+        for postman in self.postmen:
+            if postman.nearest_interactable is package:
+                postman.nearest_interactable = None
+            if self.claims.get(postman) is package:
+                del self.claims[postman]
+        self.package_pool.release(package)
+
+    def add_postman(self, input_source: TickInput | None = None) -> Postman:
+        """another postman at the player's start, a bot unless it is given its own input"""
+        assert self._start != None, "the map has no player start to add postmen at"
+        postman = Postman(self._start)
+        postman.input = input_source if input_source != None else BotInput(self, postman)
+        self.postmen.append(postman)
+        return postman
+
+    def claim(self, postman: Postman, package: Interactable) -> None:
+        self.claims[postman] = package
+
+    def unclaim(self, postman: Postman) -> None:
+        self.claims.pop(postman, None)
+
+    def claimed_by_others(self, postman: Postman | None) -> list[Interactable]:
+        return [package for owner, package in self.claims.items() if owner is not postman]
+
+    def spawn_package(self, pos: tuple[int, int], direction: Direction) -> None:
+        if self.package_store != None:
+            self.package_store.spawn(pos, direction, generate_random_package_variant())
+        else:
+            self.add_package(self.package_pool.acquire(pos, direction))
+
+    def active_rects(self) -> list[pygame.Rect]:
+        """the view and every staff postman, each with a chunk of margin on every side"""
+        margin = CHUNK_SIZE * self.size
+        rects = [self.camera.rect.inflate(margin * 2, margin * 2)]
+        rects += [postman.get_rect().inflate(margin * 2, margin * 2) for postman in self.postmen[1:]]
+        return rects
+
+    def is_active(self, pos: Vec2) -> bool:
+        """whether the simulation runs at `pos`, always when it is not culled"""
+        if not self.cull_simulation:
+            return True
+        for rect in self._active:
+            if rect.collidepoint(pos.x, pos.y):
+                return True
+        return False
+
+    def bake_background(self, size: tuple[int, int]) -> pygame.Surface:
+        """
+        composes the cached static chunks in view onto one surface,
+        it only has to be redone when the camera moves
+        """
+        background = pygame.Surface(size)
+        background.fill(0)
+        view = self.camera.rect
+        background.set_clip(pygame.Rect((0, 0), view.size))
+        for chunk in self.map.chunks_in(view):
+            background.blit(self.chunk_surfaces.get(chunk, self.map), (chunk.rect.x - view.x, chunk.rect.y - view.y))
+        background.set_clip(None)
+
+        self._background = background
+        self._background_offset = self.camera.offset
+        return background
+
+    def _follow_player(self, alpha: float) -> None:
+        if self._player != None:
+            self.camera.follow(self._player.prev_pos.lerp(self._player.pos, alpha), self.map.pixel_size)
+
+    def _needs_background(self, surf: pygame.Surface) -> bool:
+        return (self._background == None or self._background.get_size() != surf.get_size()
+                or self._background_offset != self.camera.offset)
+
+    def render(self, surf: pygame.Surface, alpha: float = 1) -> None:
+        self._follow_player(alpha)
+        if self._needs_background(surf):
+            self.bake_background(surf.get_size())
+        assert self._background != None
+
+        view = self.camera.rect
+        # only the office part of the surface, the ui below it is left alone
+        screen = pygame.Rect((0, 0), view.size)
+        surf.blit(self._background, screen, screen)
+        surf.set_clip(screen)
+        atlas = ATLAS.surface
+        surf.blits([(atlas, (x - view.x, y - view.y), sheet.area)
+                    for chunk in self.map.chunks_in(view) for x, y, sheet in chunk.animated], doreturn=False)
+        for group in self.scheduler.animation_groups.values():
+            self._animation_frames[group] = group.index
+
+        self._package_rects = {package: package.render_rect(alpha).move(-view.x, -view.y)
+                               for package in self.grid.packages_near(view)}
+        surf.blits([(atlas, rect, package.area) for package, rect in self._package_rects.items()], doreturn=False)
+
+        if self.package_store != None:
+            self.package_store.render(surf, alpha, view)
+        self._staff_rects = self._render_staff(surf, view, alpha)
+        self._prompt_rects = self._render_prompts(surf, view)
+        surf.set_clip(None)
+
+    def _render_staff(self, surf: pygame.Surface, view: pygame.Rect, alpha: float) -> list[pygame.Rect]:
+        """every postman but the player, the game draws that one itself"""
+        screen = pygame.Rect((0, 0), view.size)
+        staff = [(postman, postman.render_rect(alpha).move(-view.x, -view.y)) for postman in self.postmen[1:]]
+        staff = [(postman, rect) for postman, rect in staff if screen.colliderect(rect)]
+        surf.blits([(ATLAS.surface, rect, postman.area) for postman, rect in staff], doreturn=False)
+        return [rect.clip(screen) for _, rect in staff]
+
+    def _render_prompts(self, surf: pygame.Surface, view: pygame.Rect) -> list[pygame.Rect]:
+        return [surf.blit(TEXT.render(text, PROMPT_TEXT_SIZE), (x - view.x, y - view.y))
+                for text, (x, y) in self.prompts]
+
+    def render_dirty(self, surf: pygame.Surface, erase: list[pygame.Rect], alpha: float = 1) -> list[pygame.Rect]:
+        """
+        redraws on top of last frame's surface and returns the regions that changed.
+        `erase` are extra regions from last frame to restore, i.e where the player was.
+        """
+        self._follow_player(alpha)
+        if self._needs_background(surf) or self.package_store != None:
+            self.render(surf, alpha)
+            return [surf.get_rect()]
+        assert self._background != None
+
+        view = self.camera.rect
+        surf.set_clip(pygame.Rect((0, 0), view.size))
+
+        dirty: list[pygame.Rect] = []
+        package_rects: dict[Package, pygame.Rect] = {}
+        for package in self.grid.packages_near(view):
+            package_rects[package] = package.render_rect(alpha).move(-view.x, -view.y)
+
+        for package, rect in self._package_rects.items():
+            if package_rects.get(package) != rect:
+                erase.append(rect)
+        # prompts and staff are cheap to cover and redraw, so they are treated as moved every frame
+        erase += self._prompt_rects + self._staff_rects
+
+        for rect in erase:
+            surf.blit(self._background, rect, rect)
+            dirty.append(rect)
+
+        changed: set[Spritesheet] = set()
+        for group in self.scheduler.animation_groups.values():
+            if self._animation_frames.get(group) != group.index:
+                self._animation_frames[group] = group.index
+                changed.add(group.sheet)
+
+        atlas = ATLAS.surface
+        animated = [cell for chunk in self.map.chunks_in(view) for cell in chunk.animated]
+        rects = surf.blits([(atlas, (x - view.x, y - view.y), sheet.area) for x, y, sheet in animated])
+        dirty += [rect for (_, _, sheet), rect in zip(animated, rects) if sheet in changed]
+
+        surf.blits([(atlas, rect, package.area) for package, rect in package_rects.items()], doreturn=False)
+        dirty += [rect for package, rect in package_rects.items() if self._package_rects.get(package) != rect]
+
+        self._staff_rects = self._render_staff(surf, view, alpha)
+        dirty += self._staff_rects
+        self._prompt_rects = self._render_prompts(surf, view)
+        dirty += self._prompt_rects
+
+        surf.set_clip(None)
+        self._package_rects = package_rects
+        return dirty
 
     def update(self, dt: float) -> None:
-        tiles = [tile for subtiles in self._map_data for tile in subtiles]
-        endtiles = list(filter(lambda x: x.type == TileType.conveyorend, tiles))
-        interactables = self.packages
-
         if self._player:
-            self._player.colissions = list(filter(lambda x: not x.behaviour.can_walk_through, tiles))
-            p = self._player
-
-            if interactables:
-                self._player.nearest_interactable = min(interactables, key=lambda item: math.sqrt((item.pos.x - p.pos.x) ** 2 + (item.pos.y - p.pos.y) ** 2))
-
-        for tile in tiles:
-            if tile.behaviour.does_update:
-                tile.update(dt, self)
+            self.camera.follow(self._player.pos, self.map.pixel_size)
+        self._assign_interactables()
+        self._active = self.active_rects()
+        self.prompts.clear()
+
+        with PROFILER.section("office.tiles"):
+            fired = self.scheduler.advance(dt, self)
+
+        with PROFILER.section("office.packages"):
+            self._update_packages(dt)
+
+        with PROFILER.section("office.staff"):
+            self._update_staff(dt)
+
+        PROFILER.count("tiles", len(self.map.tiles))
+        PROFILER.count("events", fired)
+        PROFILER.count("packages", len(self.package_store) if self.package_store != None else len(self.packages))
+
+    def _update_packages(self, dt: float) -> None:
+        if self.package_store != None:
+            assert self.drop_of_tiles, "drop of tile should exist in the map"
+            self.packages_delivered += self.package_store.update(dt, [tile.pos for tile in self.drop_of_tiles],
+                                                                 self._active if self.cull_simulation else None)
+            # a delivered slot gets reused, an offer or a claim on it would point at the next package spawned there
+            alive = self.package_store.alive
+            for postman in self.postmen:
+                nearest = postman.nearest_interactable
+                if isinstance(nearest, PackageView) and not alive[nearest.slot]:
+                    postman.nearest_interactable = None
+            if self.claims:
+                self.claims = {owner: package for owner, package in self.claims.items()
+                               if not isinstance(package, PackageView) or alive[package.slot]}
+            return
 
         packages_to_remove: list[Package] = []
         for package in self.packages:
-            assert self.drop_of_tile != None, "drop of tile should exist in the map"
-            if int(package.pos.get_absolute_distance(self.drop_of_tile.pos)) <= PACKAGE_DROP_RADIUS:
-                if not package.being_held:
-                    packages_to_remove.append(package)
-                    self.packages_delivered += 1
-
-            package.colissions = list(filter(lambda x: x != package, self.packages))
-            if not package.at_end and any([package.get_rect().colliderect(tile.get_rect()) for tile in endtiles]):
-                package.at_end = True
+            package.prev_pos.set_from(package.pos)
+            if not package.being_held and not self.is_active(package.pos):
+                continue
+
+            if not package.being_held and self.at_drop_of(package.pos):
+                packages_to_remove.append(package)
+                self.packages_delivered += 1
+
+            rect = package.get_rect()
+            package.colissions = [other for other in self.grid.packages_near(rect.inflate(self.size * 2, self.size * 2)) if other is not package]
+            if package.on_conveyor and not package.at_end:
+                package.direction, package.at_end = self.flow.follow(package.pos, package.direction)
             package.update(dt)
+            self.grid.move(package)
 
         for package in packages_to_remove:
-            self.packages.remove(package)
-            del package
+            self.remove_package(package)
+
+    def at_drop_of(self, pos: Vec2) -> bool:
+        """whether a package at `pos` is close enough to any drop off to be delivered"""
+        assert self.drop_of_tiles, "drop of tile should exist in the map"
+        for tile in self.drop_of_tiles:
+            if int(pos.get_absolute_distance(tile.pos)) <= PACKAGE_DROP_RADIUS:
+                return True
+        return False
+
+    def find_package(self, pos: Vec2, radius: float, postman: Postman | None = None,
+                     skip: Collection[Interactable] = ()) -> Interactable | None:
+        """nearest package within `radius` that nobody is holding and nobody but `postman` has claimed"""
+        claimed = self.claimed_by_others(postman) + list(skip)
+        if self.package_store != None:
+            slots = [package.slot for package in claimed if isinstance(package, PackageView)]
+            return self.package_store.nearest(pos, radius, free_only=True, exclude=slots)
+        return self.grid.nearest_package(pos, radius, free_only=True, exclude=set(claimed))
+
+    def _nearest_free(self, radius: float) -> list[Interactable | None]:
+        """find_package for every postman, the array store answers all of them in one pass"""
+        if self.package_store != None:
+            index = {postman: i for i, postman in enumerate(self.postmen)}
+            claims = {package.slot: index[owner] for owner, package in self.claims.items() if isinstance(package, PackageView)}
+            return list(self.package_store.nearest_each([postman.pos for postman in self.postmen], radius, claims))
+        return [None if postman.is_holding else self.find_package(postman.pos, radius, postman) for postman in self.postmen]
+
+    def _assign_interactables(self) -> None:
+        """
+        refreshes what every postman collides with and can pick up, in one pass over the grid.
+        a package within reach of several postmen is only offered to the closest of them
+        """
+        # packages on a neighbouring tile are left to the postman's own range check
+        radius = INTERACT_RANGE + self.size
+        wanted: dict[Interactable, list[Postman]] = {}
+        for postman, package in zip(self.postmen, self._nearest_free(radius)):
+            # anything a postman can reach this tick is within a cell of its rect
+            reach = postman.get_rect().inflate(self.size * 2, self.size * 2)
+            postman.colissions = self.grid.solid_tiles_near(reach)
+            postman.nearest_interactable = None
+            if package == None or postman.is_holding:
+                continue
+            wanted.setdefault(package, []).append(postman)
+
+        # a package within reach of several postmen goes to the closest of them
+        for package, postmen in wanted.items():
+            closest = nearest_position([postman.pos for postman in postmen], package.pos) if len(postmen) > 1 else 0
+            postmen[closest].nearest_interactable = package
+
+    def _update_staff(self, dt: float) -> None:
+        """every postman but the player, the game drives that one itself"""
+        for postman in self.postmen[1:]:
+            postman.input.advance()
+            postman.update(dt)
+
+    def drop_cells(self) -> list[int]:
+        """walkable cells a package is delivered from when it is dropped there"""
+        width = self.map.width
+        cells = []
+        for tile in self.drop_of_tiles:
+            x, y = int(tile.pos.x) // self.size, int(tile.pos.y) // self.size
+            for ny in range(y - 1, y + 2):
+                for nx in range(x - 1, x + 2):
+                    corner = Vec2(nx * self.size, ny * self.size)
+                    if (self.map.walkable(nx, ny) and ny * width + nx not in cells
+                            and int(corner.get_absolute_distance(tile.pos)) <= PACKAGE_DROP_RADIUS):
+                        cells.append(ny * width + nx)
+        return cells
+
+    def drop_distances(self) -> array:
+        """cells to walk from every cell to the nearest drop cell, shared by every bot"""
+        if self._drop_distances == None:
+            self._drop_distances = self.grid.walk_distances(self.drop_cells())
+        return self._drop_distances
+
+    def pickup_cells(self, package: Interactable, margin: float = 2) -> list[int]:
+        """
+        walkable cells a postman standing on can pick the package up from, by the same checks
+        as Postman.can_interact and the offer radius, with `margin` pixels to spare for steering
+        """
+        pos = package.pos
+        width = self.map.width
+        x, y = int(pos.x) // self.size, int(pos.y) // self.size
+        cells = []
+        for ny in range(y - 1, y + 3):
+            for nx in range(x - 1, x + 3):
+                corner_x, corner_y = nx * self.size, ny * self.size
+                if (self.map.walkable(nx, ny)
+                        and math.hypot(pos.x - corner_x, pos.y - corner_y) <= INTERACT_RANGE + self.size - margin
+                        and max(pos.x - corner_x, pos.y - corner_y) < INTERACT_RANGE - margin):
+                    cells.append(ny * width + nx)
+        return cells
+
+    @property
+    def backlog(self) -> int:
+        """packages waiting on the end table"""
+        if self.package_store != None:
+            return int((self.package_store.alive & self.package_store.at_end).sum())
+        return sum(1 for package in self.packages if package.at_end and package.on_conveyor)
 
     def get_player(self) -> Postman:
         assert isinstance(self._player, Postman), "player not initialized during map generation!"
         return self._player
 
-    def _load_map(self, level: Level) -> list[str]:
-        data = []
-        with open('levels/level-'+ str(level.value)) as file:
-            for line in file.readlines():
-                line = line.replace('\n','')
-                row = line.split(',')
-                assert len(row) == MAP_WIDTH, "map data width is not of correct size"
-                data.append(row)
-
-        assert len(data) == MAP_HEIGHT, "map data height is not of correct size"
-        return data
+    def _snapshot_packages(self) -> list[tuple]:
+        """(pos, prev pos, speed, direction, variation, flags, held) for every package, in the order they are stored"""
+        store = self.package_store
+        if store != None:
+            slots = np.flatnonzero(store.alive[:store.count]).tolist()
+            return [(*store.pos[slot].tolist(), *store.prev_pos[slot].tolist(), float(store.speed[slot]),
+                     int(store.direction[slot]), int(store.variation[slot]),
+                     SNAPSHOT_ON_CONVEYOR * bool(store.on_conveyor[slot]) | SNAPSHOT_AT_END * bool(store.at_end[slot]) |
+                     SNAPSHOT_BEING_HELD * bool(store.being_held[slot]), store.view(slot))
+                    for slot in slots]
+        return [(package.pos.x, package.pos.y, package.prev_pos.x, package.prev_pos.y, package.speed,
+                 package.direction.value, package.variation.value,
+                 SNAPSHOT_ON_CONVEYOR * package.on_conveyor | SNAPSHOT_AT_END * package.at_end |
+                 SNAPSHOT_BEING_HELD * package.being_held, package)
+                for package in self.packages]
+
+    def snapshot(self, ticks: int = 0) -> bytes:
+        """the whole simulation, the postmen and RNG as one binary blob, see SNAPSHOT_HEADER"""
+        assert self.level_path != None, "snapshot before the map was generated"
+        scheduler = self.scheduler
+        groups = list(scheduler.animation_groups.values())
+        group_ids = {group: -1 - i for i, group in enumerate(groups)}
+        width = self.map.pixel_size[0] // self.size
+        packages = self._snapshot_packages()
+        indices = {id(package[-1]): i for i, package in enumerate(packages)}
+
+        level = self.level_path.encode("utf-8")
+        parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, ticks, scheduler.now, scheduler._sequence,
+                                      self.packages_delivered, len(groups), len(scheduler._timers), len(packages),
+                                      len(self.postmen), len(level)),
+                 level]
+        parts += [SNAPSHOT_POSTMAN.pack(postman.pos.x, postman.pos.y, postman.prev_pos.x, postman.prev_pos.y,
+                                        postman.velocity.x, postman.velocity.y, postman.acceleration, postman.interact_delta,
+                                        indices.get(id(postman.currently_holding), -1),
+                                        indices.get(id(self.claims.get(postman)), -1))
+                  for postman in self.postmen]
+        _, words, gauss = RNG.getstate()
+        parts.append(SNAPSHOT_RNG.pack(*words, gauss != None, gauss if gauss != None else 0))
+        parts += [SNAPSHOT_GROUP.pack(group.index) for group in groups]
+        for due, sequence, event, target in scheduler._timers:
+            if isinstance(target, AnimationGroup):
+                target_id = group_ids[target]
+            else:
+                target_id = int(target.pos.y) // self.size * width + int(target.pos.x) // self.size
+            parts.append(SNAPSHOT_TIMER.pack(due, sequence, event.value, target_id))
+        parts += [SNAPSHOT_PACKAGE.pack(*package[:-1]) for package in packages]
+        return b"".join(parts)
+
+    def restore(self, data: bytes) -> int:
+        """puts a snapshot of the same level back and returns the tick it was taken on"""
+        (magic, version, ticks, now, sequence, delivered, group_count, timer_count,
+         package_count, postman_count, level_length) = SNAPSHOT_HEADER.unpack_from(data)
+        assert magic == SNAPSHOT_MAGIC, "not a snapshot"
+        assert version == SNAPSHOT_VERSION, f"unsupported snapshot version {version}"
+        offset = SNAPSHOT_HEADER.size
+        level = data[offset:offset + level_length].decode("utf-8")
+        assert level == self.level_path, f"snapshot is of {level}, not {self.level_path}"
+        offset += level_length
+
+        assert postman_count == len(self.postmen), f"snapshot has {postman_count} postmen, the office {len(self.postmen)}"
+        postmen = list(SNAPSHOT_POSTMAN.iter_unpack(data[offset:offset + postman_count * SNAPSHOT_POSTMAN.size]))
+        offset += postman_count * SNAPSHOT_POSTMAN.size
+        *words, has_gauss, gauss = SNAPSHOT_RNG.unpack_from(data, offset)
+        offset += SNAPSHOT_RNG.size
+
+        scheduler = self.scheduler
+        groups = list(scheduler.animation_groups.values())
+        assert len(groups) == group_count, "snapshot does not match the map's animations"
+        for group, (index,) in zip(groups, SNAPSHOT_GROUP.iter_unpack(data[offset:offset + group_count * SNAPSHOT_GROUP.size])):
+            group.sheet._index = index
+        offset += group_count * SNAPSHOT_GROUP.size
+
+        width = self.map.pixel_size[0] // self.size
+        events = {event.value: event for event in TileEvent}
+        timers = []
+        for due, timer_sequence, event, target_id in SNAPSHOT_TIMER.iter_unpack(data[offset:offset + timer_count * SNAPSHOT_TIMER.size]):
+            target = groups[-1 - target_id] if target_id < 0 else self.map.get(target_id % width, target_id // width)
+            assert target != None, "snapshot timer on an empty cell"
+            timers.append((due, timer_sequence, events[event], target))
+        offset += timer_count * SNAPSHOT_TIMER.size
+        # saved in heap order, so it is still a heap
+        scheduler._timers = timers
+        scheduler.now = now
+        scheduler._sequence = sequence
+
+        for package in list(self.packages):
+            self.remove_package(package)
+        if self.package_store != None:
+            self.package_store = PackageStore()
+            self.package_store.set_flow(self.flow)
+        restored: list[Interactable] = []
+        variations = {variation.value: variation for variation in PackageVariation}
+        for x, y, prev_x, prev_y, speed, direction, variation, flags in SNAPSHOT_PACKAGE.iter_unpack(
+                data[offset:offset + package_count * SNAPSHOT_PACKAGE.size]):
+            if self.package_store != None:
+                store = self.package_store
+                slot = store.spawn((x, y), DIRECTION_BY_VALUE[direction], variations[variation], speed)
+                store.prev_pos[slot] = (prev_x, prev_y)
+                store.on_conveyor[slot] = bool(flags & SNAPSHOT_ON_CONVEYOR)
+                store.at_end[slot] = bool(flags & SNAPSHOT_AT_END)
+                store.being_held[slot] = bool(flags & SNAPSHOT_BEING_HELD)
+                restored.append(store.view(slot))
+            else:
+                package = self.package_pool.acquire((x, y), DIRECTION_BY_VALUE[direction], variations[variation])
+                package.prev_pos.set(prev_x, prev_y)
+                package.speed = speed
+                package.on_conveyor = bool(flags & SNAPSHOT_ON_CONVEYOR)
+                package.at_end = bool(flags & SNAPSHOT_AT_END)
+                package.being_held = bool(flags & SNAPSHOT_BEING_HELD)
+                self.add_package(package)
+                restored.append(package)
+
+        self.claims = {}
+        for postman, (px, py, ppx, ppy, vx, vy, acceleration, interact_delta, held, claimed) in zip(self.postmen, postmen):
+            postman.pos.set(px, py)
+            postman.prev_pos.set(ppx, ppy)
+            postman.velocity.set(vx, vy)
+            postman.acceleration = acceleration
+            postman.interact_delta = interact_delta
+            postman.currently_holding = restored[held] if held >= 0 else None
+            postman.nearest_interactable = None
+            if claimed >= 0:
+                self.claims[postman] = restored[claimed]
+        self.packages_delivered = delivered
+        # last, acquiring packages above may not draw from it
+        RNG.setstate((3, tuple(words), gauss if has_gauss else None))
+
+        self.prompts.clear()
+        self._package_rects = {}
+        self._staff_rects = []
+        self._background = None
+        self.camera.follow(self.get_player().pos, self.map.pixel_size)
+        self._active = self.active_rects()
+        return ticks
 
 class PackageVariation(enum.Enum):
     mail                  = enum.auto()
@@ -404,14 +2309,39 @@ class PackageVariation(enum.Enum):
     package_with_fragile  = enum.auto()
     package_with_heavy    = enum.auto()
 
+# every random decision in the simulation draws from here, seed it for reproducible runs
+RNG = random.Random()
+
+def seed_simulation(seed: int) -> None:
+    RNG.seed(seed)
+
 def generate_random_package_variant() -> PackageVariation:
-    return PackageVariation[random.choice(PackageVariation._member_names_)]
+    return PackageVariation[RNG.choice(PackageVariation._member_names_)]
+
+# behaviours carry no state of their own, so every package of a variation shares one
+PACKAGE_BEHAVIOURS: dict[PackageVariation, PackageBehaviour] = {
+    variation: HeavyPackageBehaviour() if variation is PackageVariation.package_with_heavy else PackageBehaviour()
+    for variation in PackageVariation
+}
 
 class Package:
-    def __init__(self, pos: tuple[int, int], direction: Direction) -> None:
+    __slots__ = ("pos", "prev_pos", "variation", "surf", "area", "direction", "colissions",
+                 "speed", "on_conveyor", "at_end", "being_held", "index")
+
+    def __init__(self, pos: tuple[int, int], direction: Direction, variation: PackageVariation | None = None) -> None:
         self.pos = Vec2.from_tuple(pos)
-        self.variation: PackageVariation = generate_random_package_variant()
-        self.surf = pygame.image.load(f"assets/{self.variation.name}.png")
+        self.prev_pos = self.pos.copy()
+        # position in Office.packages, for swap removal
+        self.index = -1
+        self.reset(pos, direction, variation)
+
+    def reset(self, pos: tuple[int, int], direction: Direction, variation: PackageVariation | None = None) -> None:
+        """puts the package back into its freshly spawned state, reusing its vectors"""
+        self.pos.x, self.pos.y = pos
+        self.prev_pos.x, self.prev_pos.y = pos
+        self.variation: PackageVariation = variation if variation != None else generate_random_package_variant()
+        self.surf = ASSETS.image(f"assets/{self.variation.name}.png")
+        self.area = ATLAS.image(f"assets/{self.variation.name}.png")
         self.direction = direction
         self.colissions: list[Package] | None = None
         self.speed = 3
@@ -421,27 +2351,27 @@ class Package:
 
     @property
     def coliding(self) -> bool:
-        return any([self.get_rect().colliderect(package.get_rect()) for package in self.colissions]) if self.colissions != None else False
+        if not self.colissions:
+            return False
+        rect = self.get_rect()
+        return any(rect.colliderect(package.get_rect()) for package in self.colissions)
 
     @property
     def behaviour(self) -> PackageBehaviour:
-        if self.variation is PackageVariation.package_with_heavy:
-            return HeavyPackageBehaviour()
-        else:
-            return PackageBehaviour()
+        return PACKAGE_BEHAVIOURS[self.variation]
 
     def update(self, dt) -> None:
         if self.at_end or not self.on_conveyor:
             return
         normalized_dt = dt / 100
-        start_pos = self.pos.copy()
+        start_x, start_y = self.pos.x, self.pos.y
         if self.direction == Direction.up:
             self.pos.y += normalized_dt * self.speed
         if self.direction == Direction.down:
             self.pos.y -= normalized_dt * self.speed
 
         if self.coliding:
-            self.pos.y = start_pos.y
+            self.pos.y = start_y
 
         if self.direction == Direction.right:
             self.pos.x += normalized_dt * self.speed
@@ -449,10 +2379,14 @@ class Package:
             self.pos.x -= normalized_dt * self.speed
 
         if self.coliding:
-            self.pos.x = start_pos.x
+            self.pos.x = start_x
+
+    def move_to(self, pos: Vec2) -> None:
+        self.pos.set_from(pos)
 
     def interact(self, postman: Postman) -> None:
-        if not postman.is_holding:
+        # whoever reaches it first this tick gets it
+        if not postman.is_holding and not self.being_held:
             postman.currently_holding = self
             self.on_conveyor = False
             self.being_held = True
@@ -469,106 +2403,395 @@ class Package:
         rect.y = int(self.pos.y)
         return rect
 
+    def render_rect(self, alpha: float = 1) -> pygame.Rect:
+        pos = self.prev_pos.lerp(self.pos, alpha)
+        rect = self.surf.get_rect()
+        rect.x = int(pos.x)
+        rect.y = int(pos.y)
+        return rect
+
     def __str__(self) -> str:
         return str(self.variation.name.replace("_", " "))
 
-class Tool:
-    ...
-
-class Tile:
-    def __init__(self, type: TileType, pos: tuple[int, int]) -> None:
-        self.type = type
-        self.sheet = self._infer_sheet_from_type(type)
-        self.pos = Vec2.from_tuple(pos)
-        self._behaviour: None | Behaviour =  None
-        self.animation_index = 0
-
-    def update(self, dt: float, office: Office) -> None:
-        assert self.behaviour.does_update, "tried to update on a tile without update behaviour"
-
-        if isinstance(self.behaviour, ConveyorSpawnerBehaviour):
-            self.behaviour.delta -= dt/1000
-            if self.behaviour.delta < 0:
-                self.behaviour.spawn_package(self.pos.as_tuple(), office)
-                self.behaviour.delta = self.behaviour.interval
+DIRECTION_VECTORS = {
+    Direction.up: (0, 1),
+    Direction.down: (0, -1),
+    Direction.left: (-1, 0),
+    Direction.right: (1, 0),
+}
+DIRECTION_BY_VALUE: dict[int, Direction] = {direction.value: direction for direction in Direction}
+
+class PackageView:
+    """Interactable over one slot of a PackageStore, so the postman can hold array packages"""
+    def __init__(self, store: PackageStore, slot: int) -> None:
+        self.store = store
+        self.slot = slot
+        # refreshed from the columns on every read rather than allocated
+        self._pos = Vec2(0, 0)
 
-        if self.behaviour.animated:
-            self.behaviour.animation_delta -= dt/1000
-            if self.behaviour.animation_delta < 0:
-                self.sheet.next()
-                self.behaviour.animation_delta = self.behaviour.animation_interval
+    @property
+    def pos(self) -> Vec2:
+        x, y = self.store.pos[self.slot].tolist()
+        self._pos.x = x
+        self._pos.y = y
+        return self._pos
 
-        if self.type is TileType.stamper:
-            assert office._player != None
-            distance = office._player.pos.get_absolute_distance(self.pos)
-            if distance <= INTERACT_RANGE:
-                # it is odd that this is drawn in the update hook
-                self._display_text_highlight((self.pos + Vec2(0, 16)).as_tuple())
-
-    def _display_text_highlight(self, pos: tuple[int, int]) -> None:
-        #TODO
-        ...
+    @pos.setter
+    def pos(self, pos: Vec2) -> None:
+        self.store.pos[self.slot] = (pos.x, pos.y)
 
-    def get_rect(self) -> pygame.Rect:
-        rect = self.sheet.active.get_rect()
-        rect.x = int(self.pos.x)
-        rect.y = int(self.pos.y)
-        return rect
+    def move_to(self, pos: Vec2) -> None:
+        self.pos = pos
 
     @property
-    def behaviour(self) -> Behaviour:
-        if self._behaviour:
-            return self._behaviour
+    def variation(self) -> PackageVariation:
+        return PackageVariation(int(self.store.variation[self.slot]))
 
-        behaviour = Behaviour
-        if self.type == TileType.wall:
-            behaviour = WallBehaviour()
+    @property
+    def surf(self) -> pygame.Surface:
+        return ASSETS.image(f"assets/{self.variation.name}.png")
 
-        elif self.type == TileType.wall_full:
-            behaviour = WallBehaviour()
+    @property
+    def behaviour(self) -> PackageBehaviour:
+        return PACKAGE_BEHAVIOURS[self.variation]
 
-        elif self.type == TileType.package_spawner:
-            behaviour = ConveyorSpawnerBehaviour()
+    def interact(self, postman: Postman) -> None:
+        if not postman.is_holding and not self.store.being_held[self.slot]:
+            postman.currently_holding = self
+            self.store.on_conveyor[self.slot] = False
+            self.store.being_held[self.slot] = True
 
-        elif self.type == TileType.floor:
-            behaviour = FloorBehaviour()
+    def drop(self) -> None:
+        self.store.being_held[self.slot] = False
 
-        elif self.type == TileType.conveyor:
-            behaviour = ConveyorBehaviour()
+    def get_rect(self) -> pygame.Rect:
+        x, y = self.store.pos[self.slot]
+        return pygame.Rect(int(x), int(y), SIZE, SIZE)
 
-        self._behaviour = behaviour
-        return behaviour
+    def __str__(self) -> str:
+        return str(self.variation.name.replace("_", " "))
 
+class PackageStore:
+    """
+    struct-of-arrays storage for packages, every column is indexed by slot.
+    movement, the end table check and deliveries run as one numpy pass per tick.
+    packages on the routed belts queue behind the package ahead on the way to the same end,
+    anything else only behind packages on the same row or column, going the same direction.
+    """
+    def __init__(self, capacity: int = 256) -> None:
+        assert load_numpy(), "the array package store requires numpy"
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.prev_pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.direction = np.zeros(capacity, dtype=np.int8)
+        self.speed = np.zeros(capacity, dtype=np.float64)
+        self.variation = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.on_conveyor = np.zeros(capacity, dtype=bool)
+        self.at_end = np.zeros(capacity, dtype=bool)
+        self.being_held = np.zeros(capacity, dtype=bool)
+        self._free: list[int] = []
+        self._views: dict[int, PackageView] = {}
+        self._flow: FlowField | None = None
+        # atlas area of every variation, indexed by PackageVariation.value
+        self._areas = {variation.value: ATLAS.image(f"assets/{variation.name}.png") for variation in PackageVariation}
+
+        # indexed by Direction.value
+        vectors = np.zeros((len(Direction) + 1, 2), dtype=np.int8)
+        for direction, vector in DIRECTION_VECTORS.items():
+            vectors[direction.value] = vector
+        self._axis = np.abs(vectors[:, 1]).astype(np.intp)
+        self._sign = vectors.sum(axis=1).astype(np.float64)
+
+    def __len__(self) -> int:
+        return int(self.alive[:self.count].sum())
 
-    def _infer_sheet_from_type(self, TileType) -> Spritesheet:
-        sheet = None
-        if self.type == TileType.wall:
-            sheet = Spritesheet("assets/wall_tile.png")
+    @property
+    def capacity(self) -> int:
+        return len(self.alive)
+
+    def set_flow(self, flow: FlowField) -> None:
+        self._flow = flow
+        self._flow_distance = np.frombuffer(flow.distance, dtype=np.int32)
+        self._flow_end = np.frombuffer(flow.end, dtype=np.int32)
+        self._flow_direction = np.frombuffer(flow.direction, dtype=np.uint8).astype(np.int8)
+        self._flow_last = np.array((max(flow.width - 1, 0), max(flow.height - 1, 0)))
+        self._flow_strides = np.array((1, flow.width))
+        # indexed by Direction.value, from a package's top left to the middle of its front edge
+        self._vectors = np.zeros((len(Direction) + 1, 2), dtype=np.float64)
+        for direction, vector in DIRECTION_VECTORS.items():
+            self._vectors[direction.value] = vector
+        self._front = SIZE / 2 + self._vectors * SIZE / 2 - (self._vectors > 0)
+
+    def _cells(self, points):
+        """FlowField.cell_at for an (n, 2) array of points, as cell coordinates and as indices"""
+        # packages never leave the map, the bounds only keep the lookups in range
+        cell = np.minimum(np.maximum((points * (1 / SIZE)).astype(np.intp), 0), self._flow_last)
+        return cell, cell @ self._flow_strides
+
+    def _follow(self, slots):
+        """FlowField.follow for every given slot at once, returns the cells their middles are in"""
+        direction = self.direction[slots]
+        pos = self.pos[slots]
+        _, front = self._cells(pos + self._front[direction])
+        at_end = self._flow_distance[front] == 0
+        self.at_end[slots] = at_end
+
+        cell, cells = self._cells(pos + SIZE / 2)
+        turn = self._flow_direction[cells]
+        turning = np.flatnonzero((turn != direction) & (turn != 0) & ~at_end)
+        if len(turning):
+            origin = cell[turning] * SIZE
+            reached = ((pos[turning] - origin) * self._vectors[direction[turning]]).sum(axis=1) >= 0
+            turning = turning[reached]
+            self.pos[slots[turning]] = origin[reached]
+            self.direction[slots[turning]] = turn[turning]
+        return cell, cells
+
+    def spawn(self, pos: tuple[int, int], direction: Direction, variation: PackageVariation, speed: float = 3) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self.count == self.capacity:
+                self._grow()
+            slot = self.count
+            self.count += 1
+
+        self.pos[slot] = pos
+        self.prev_pos[slot] = pos
+        self.direction[slot] = direction.value
+        self.speed[slot] = speed
+        self.variation[slot] = variation.value
+        self.alive[slot] = True
+        self.on_conveyor[slot] = True
+        self.at_end[slot] = False
+        self.being_held[slot] = False
+        return slot
+
+    def remove(self, slots) -> None:
+        self.alive[slots] = False
+        for slot in np.atleast_1d(slots).tolist():
+            self._free.append(slot)
+            self._views.pop(slot, None)
+
+    def view(self, slot: int) -> PackageView:
+        view = self._views.get(slot)
+        if view == None:
+            view = PackageView(self, slot)
+            self._views[slot] = view
+        return view
+
+    def nearest(self, pos: Vec2, radius: float, free_only: bool = False,
+                exclude: Collection[int] = ()) -> PackageView | None:
+        """`exclude` are slots claimed by someone else"""
+        candidates = self.alive[:self.count]
+        if free_only:
+            candidates = candidates & ~self.being_held[:self.count]
+        if exclude:
+            candidates = candidates.copy()
+            candidates[list(exclude)] = False
+        slots = np.flatnonzero(candidates)
+        if not len(slots):
+            return None
+        distances = np.hypot(self.pos[slots, 0] - pos.x, self.pos[slots, 1] - pos.y)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] > radius:
+            return None
+        return self.view(int(slots[nearest]))
+
+    def nearest_each(self, points: list[Vec2], radius: float, claims: dict[int, int]) -> list[PackageView | None]:
+        """
+        the nearest free package to every point as one distance matrix.
+        `claims` maps a slot to the index of the point that claimed it, the other points skip it
+        """
+        slots = np.flatnonzero(self.alive[:self.count] & ~self.being_held[:self.count])
+        if not len(slots) or not points:
+            return [None] * len(points)
+        xy = np.array([(point.x, point.y) for point in points])
+        distances = np.hypot(self.pos[slots, 0] - xy[:, :1], self.pos[slots, 1] - xy[:, 1:])
+        if claims:
+            owner = np.full(self.count, -1)
+            owner[list(claims)] = list(claims.values())
+            owners = owner[slots]
+            distances[(owners >= 0) & (owners != np.arange(len(points))[:, None])] = np.inf
+        nearest = np.argmin(distances, axis=1).tolist()
+        return [self.view(int(slots[column])) if distances[row, column] <= radius else None
+                for row, column in enumerate(nearest)]
+
+    def update(self, dt: float, drop_ofs: list[Vec2], active: list[pygame.Rect] | None = None) -> int:
+        """
+        advances every package one tick and returns how many got delivered.
+        packages outside of the `active` rects are paused, but still hold up the ones behind them
+        """
+        n = self.count
+        self.prev_pos[:n] = self.pos[:n]
+        pos = self.pos[:n]
+        alive = self.alive[:n]
+        awake = None
+        if active != None:
+            awake = np.zeros(n, dtype=bool)
+            for rect in active:
+                awake |= ((pos[:, 0] >= rect.left) & (pos[:, 0] < rect.right)
+                          & (pos[:, 1] >= rect.top) & (pos[:, 1] < rect.bottom))
+
+        # same distance the object path measures, Vec2.get_absolute_distance, to any of the drop offs
+        in_radius = np.zeros(n, dtype=bool)
+        for drop_of in drop_ofs:
+            offset = pos - (drop_of.x, drop_of.y)
+            in_radius |= np.abs(offset).max(axis=1).astype(np.int64) <= PACKAGE_DROP_RADIUS
+        deliverable = alive & in_radius & ~self.being_held[:n]
+        if awake is not None:
+            deliverable &= awake
+        delivered = np.flatnonzero(deliverable)
+
+        lane_members = np.flatnonzero(alive & self.on_conveyor[:n])
+        if len(lane_members):
+            cell, cells = self._follow(lane_members) if self._flow != None else (None, None)
+            self._move(dt, lane_members, cell, cells, awake)
+
+        if len(delivered):
+            self.remove(delivered)
+        return len(delivered)
+
+    def _move(self, dt: float, lane_members, cell=None, cells=None, awake=None) -> None:
+        direction = self.direction[lane_members]
+        axis = self._axis[direction]
+        sign = self._sign[direction]
+        step = self.speed[lane_members] * dt / 100
+
+        pos = self.pos[lane_members]
+        members = np.arange(len(lane_members))
+        progress = pos[members, axis] * sign
+        lane = pos[members, 1 - axis].astype(np.int64)
+
+        if self._flow != None:
+            # on the routed belts the lane is the end they drain into and progress the path left to it
+            distance = self._flow_distance[cells]
+            routed = distance > 0
+            along = progress - cell[members, axis] * SIZE * sign
+            progress = np.where(routed, along - distance * SIZE, progress)
+            lane = np.where(routed, self._flow_end[cells], -1 - lane)
+            direction = np.where(routed, 0, direction)
+
+        # sort each lane by progress so the package ahead is always the next entry
+        order = np.lexsort((progress, lane, direction))
+        progress, lane, direction = progress[order], lane[order], direction[order]
+        same_lane = (lane[1:] == lane[:-1]) & (direction[1:] == direction[:-1])
+        blocked = np.zeros(len(order), dtype=bool)
+        blocked[:-1] = same_lane & (progress[1:] - progress[:-1] - step[order][:-1] < SIZE)
+
+        moving = np.zeros(len(order), dtype=bool)
+        moving[order] = ~blocked
+        moving &= ~self.at_end[lane_members]
+        if awake is not None:
+            moving &= awake[lane_members]
+
+        slots = lane_members[moving]
+        self.pos[slots, axis[moving]] += sign[moving] * step[moving]
+
+    def render(self, surf: pygame.Surface, alpha: float = 1, view: pygame.Rect | None = None) -> None:
+        if view == None:
+            view = surf.get_rect()
+        n = self.count
+        pos = self.pos[:n]
+        visible = (self.alive[:n] & (pos[:, 0] > view.left - SIZE) & (pos[:, 0] < view.right) &
+                   (pos[:, 1] > view.top - SIZE) & (pos[:, 1] < view.bottom))
+        slots = np.flatnonzero(visible)
+        pos = self.prev_pos[slots] + (self.pos[slots] - self.prev_pos[slots]) * alpha - view.topleft
+        areas = self._areas
+        atlas = ATLAS.surface
+        surf.blits([(atlas, (int(x), int(y)), areas[variation]) for variation, (x, y)
+                    in zip(self.variation[slots].tolist(), pos.tolist())], doreturn=False)
+
+    def _grow(self) -> None:
+        capacity = self.capacity * 2
+        for column in ("pos", "prev_pos", "direction", "speed", "variation", "alive", "on_conveyor", "at_end", "being_held"):
+            old = getattr(self, column)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+class PackagePool:
+    """hands delivered packages back out on the next spawn instead of allocating new ones"""
+    def __init__(self) -> None:
+        self._free: list[Package] = []
+        self.allocated = 0
+        self.reused = 0
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self, pos: tuple[int, int], direction: Direction, variation: PackageVariation | None = None) -> Package:
+        if self._free:
+            self.reused += 1
+            package = self._free.pop()
+            package.reset(pos, direction, variation)
+            return package
+
+        self.allocated += 1
+        return Package(pos, direction, variation)
+
+    def release(self, package: Package) -> None:
+        package.colissions = None
+        package.index = -1
+        self._free.append(package)
 
-        elif self.type == TileType.wall_full:
-            sheet = Spritesheet("assets/wall_tile.png")
-            sheet.active.fill((172, 40, 71))
+class Tool:
+    ...
 
-        elif self.type == TileType.floor:
-            sheet = Spritesheet("assets/floor_tile.png")
+class TileKind:
+    """what every cell of one TileType shares, its behaviour flyweight and its sheet"""
+    __slots__ = ("type", "behaviour", "sheet")
 
-        elif self.type == TileType.conveyor:
-            sheet = Spritesheet("assets/conveyor-tile.png")
+    def __init__(self, type: TileType, behaviour: Behaviour, sheet: Spritesheet) -> None:
+        self.type = type
+        self.behaviour = behaviour
+        self.sheet = sheet
 
-        elif self.type == TileType.conveyorend:
-            sheet = Spritesheet("assets/dark_table.png")
+class Tile:
+    """a cell with state of its own, every other cell is only its TileKind"""
+    def __init__(self, kind: TileKind, pos: tuple[int, int]) -> None:
+        self.kind = kind
+        self.sheet = kind.sheet
+        self.pos = Vec2.from_tuple(pos)
+        # spawners each point their own way, so they can not share the kind's behaviour
+        self._behaviour: None | Behaviour = ConveyorSpawnerBehaviour() if kind.type is TileType.package_spawner else None
 
-        elif self.type == TileType.package_spawner:
-            sheet = Spritesheet("assets/conveyor-tile.png")
+    @property
+    def type(self) -> TileType:
+        return self.kind.type
+
+    def on_event(self, event: TileEvent, office: Office) -> float:
+        """handles a scheduled event and returns the seconds until it should fire again"""
+        assert event is TileEvent.spawn, "tile animation is driven by its AnimationGroup"
+        assert isinstance(self.behaviour, ConveyorSpawnerBehaviour)
+        # spawners far outside the view are paused along with their belts
+        if office.is_active(self.pos):
+            self.behaviour.spawn_package(self.pos.as_tuple(), office)
+        return self.behaviour.interval
+
+    def on_player_near(self, player: Postman, office: Office) -> None:
+        if self.type is TileType.stamper:
+            # measured between top left corners, so standing on a neighbouring tile is SIZE away
+            distance = player.pos.get_absolute_distance(self.pos)
+            if distance <= INTERACT_RANGE + SIZE:
+                self._display_text_highlight((int(self.pos.x), int(self.pos.y) + 16), office)
 
-        elif self.type == TileType.stamper:
-            sheet = Spritesheet("assets/stamper.png")
+    def _display_text_highlight(self, pos: tuple[int, int], office: Office) -> None:
+        # only queued here, the office draws it through TEXT when it renders
+        office.prompts.append((STAMPER_PROMPT, pos))
 
-        else:
-            sheet = Spritesheet("assets/floor_tile.png")
+    def get_rect(self) -> pygame.Rect:
+        rect = self.sheet.active.get_rect()
+        rect.x = int(self.pos.x)
+        rect.y = int(self.pos.y)
+        return rect
 
-        assert sheet != None
-        return sheet
+    @property
+    def behaviour(self) -> Behaviour:
+        if self._behaviour:
+            return self._behaviour
+        return self.kind.behaviour
 
 class TileType(enum.Enum):
     wall             = enum.auto()
@@ -580,74 +2803,632 @@ class TileType(enum.Enum):
     wall_full        = enum.auto()
     stamper          = enum.auto()
 
+# anything not listed here has the Behaviour defaults, which are solid
+TILE_BEHAVIOURS: dict[TileType, type[Behaviour]] = {
+    TileType.wall: WallBehaviour,
+    TileType.wall_full: WallBehaviour,
+    TileType.package_spawner: ConveyorSpawnerBehaviour,
+    TileType.floor: FloorBehaviour,
+    TileType.conveyor: ConveyorBehaviour,
+}
+
+# image and fill, anything not listed here is drawn as floor
+TILE_SHEETS: dict[TileType, tuple[str, tuple[int, int, int] | None]] = {
+    TileType.wall: ("assets/wall_tile.png", None),
+    TileType.wall_full: ("assets/wall_tile.png", (172, 40, 71)),
+    TileType.floor: ("assets/floor_tile.png", None),
+    TileType.conveyor: ("assets/conveyor-tile.png", None),
+    TileType.conveyorend: ("assets/dark_table.png", None),
+    TileType.package_spawner: ("assets/conveyor-tile.png", None),
+    TileType.stamper: ("assets/stamper.png", None),
+}
+
+class ScaleMode(enum.Enum):
+    nearest = enum.auto()   # stretched over the whole window, hard pixel edges
+    smooth  = enum.auto()   # stretched with bilinear filtering
+    integer = enum.auto()   # largest whole multiple that fits, centred with black bars
+    display = enum.auto()   # SDL scales the window itself, through the SCALED flag
+
+class Presenter:
+    """
+    scales the render surface onto the display. the destination is a subsurface of
+    the display worked out once, so no frame allocates a full resolution surface.
+    """
+    def __init__(self, size: tuple[int, int], source_size: tuple[int, int], mode: ScaleMode = ScaleMode.nearest) -> None:
+        self.mode = mode
+        self.source_size = source_size
+        if mode is ScaleMode.display:
+            self.display = pygame.display.set_mode(source_size, pygame.SCALED)
+        else:
+            self.display = pygame.display.set_mode(size)
+        self.frames = 0
+        self.total_us: float = 0
+        self.last_us: float = 0
+        self._layout()
+
+    def _layout(self) -> None:
+        width, height = self.display.get_size()
+        source_width, source_height = self.source_size
+        if self.mode is ScaleMode.integer:
+            factor = max(1, min(width // source_width, height // source_height))
+            size = (source_width * factor, source_height * factor)
+            self.target = pygame.Rect((0, 0), size)
+            self.target.center = (width // 2, height // 2)
+        else:
+            self.target = pygame.Rect(0, 0, width, height)
+        self.scale_x = self.target.width / source_width
+        self.scale_y = self.target.height / source_height
+        # scaling a region on its own only samples like the full frame for whole, unfiltered factors
+        self._scales_rects = (self.mode is not ScaleMode.smooth
+                              and self.scale_x.is_integer() and self.scale_y.is_integer())
+        # the bars around an integer scaled frame are never drawn over, they only need clearing once
+        self.display.fill(0)
+        self._destination = self.display.subsurface(self.target)
+
+    def _scale(self, source: pygame.Surface, destination: pygame.Surface) -> None:
+        if self.mode is ScaleMode.smooth:
+            pygame.transform.smoothscale(source, destination.get_size(), destination)
+        else:
+            pygame.transform.scale(source, destination.get_size(), destination)
+
+    def present(self, surf: pygame.Surface) -> None:
+        start = time.perf_counter_ns()
+        if self.mode is ScaleMode.display:
+            self.display.blit(surf, (0, 0))
+        else:
+            self._scale(surf, self._destination)
+        pygame.display.flip()
+        self._record(start)
+
+    def present_rects(self, surf: pygame.Surface, rects: list[pygame.Rect]) -> None:
+        """
+        pushes only the given regions of the render surface to the display.
+        with fractional factors the whole frame is still scaled, so the regions sample
+        exactly like a full present, only the transfer to the window is cut down
+        """
+        start = time.perf_counter_ns()
+        bounds = surf.get_rect()
+        scale_whole = self.mode is not ScaleMode.display and not self._scales_rects
+        if scale_whole:
+            self._scale(surf, self._destination)
+        updated = []
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if not rect.width or not rect.height:
+                continue
+
+            if self.mode is ScaleMode.display:
+                updated.append(self.display.blit(surf, rect, rect))
+                continue
+
+            left, top = math.floor(rect.left * self.scale_x), math.floor(rect.top * self.scale_y)
+            right, bottom = math.ceil(rect.right * self.scale_x), math.ceil(rect.bottom * self.scale_y)
+            target = pygame.Rect(left, top, right - left, bottom - top).clip(self._destination.get_rect())
+            if not scale_whole:
+                self._scale(surf.subsurface(rect), self._destination.subsurface(target))
+            updated.append(target.move(self.target.topleft))
+
+        if updated:
+            pygame.display.update(updated)
+        self._record(start)
+
+    def _record(self, start: int) -> None:
+        self.last_us = (time.perf_counter_ns() - start) / 1000
+        self.total_us += self.last_us
+        self.frames += 1
+
+    @property
+    def mean_us(self) -> float:
+        return self.total_us / self.frames if self.frames else 0
+
+    def report(self) -> str:
+        return f"present ({self.mode.name}): {self.mean_us:.0f}us/frame over {self.frames} frames, last {self.last_us:.0f}us"
+
 
 class Game:
-    def __init__(self, DISPLAY_DIMESION) -> None:
-        self.display = pygame.display.set_mode(DISPLAY_DIMESION)
+    def __init__(self, DISPLAY_DIMESION, dirty_rendering: bool = True, array_packages: bool = False,
+                 tick_rate: float = TICK_RATE, fps: int = FPS, level: Level | str = Level.test,
+                 record_path: str | None = None, seed: int = 0, scale_mode: ScaleMode = ScaleMode.nearest,
+                 snapshot: bytes | None = None, autosave_path: str | None = None, startup_only: bool = False,
+                 staff: int = 0, cull_simulation: bool = True) -> None:
+        # the pngs decode on worker threads while the window opens, converting them waits for the display
+        ASSETS.preload(asset_paths())
+        self.presenter = Presenter(DISPLAY_DIMESION, RENDER_DIMENSION, scale_mode)
+        self.display = self.presenter.display
+        STARTUP.mark("display init")
+        ATLAS.pack_directory()
+        ATLAS.convert()
+        STARTUP.mark("asset load")
         self.surf = pygame.surface.Surface(RENDER_DIMENSION)
         self.clock = pygame.time.Clock()
         self.deltatime = 0
         self.running = True
-
-        self.office = Office(size=SIZE)
-        self.office.generate_map(Level.test)
+        # the simulation always advances in steps of `timestep`, independent of the render rate
+        self.fps = fps
+        self.timestep = 1000 / tick_rate
+        self._accumulator: float = 0
+        # when set, only the changed regions of the surface are redrawn and pushed to the display
+        self.dirty_rendering = dirty_rendering
+        self._presented = False
+        self._player_rect: pygame.Rect | None = None
+        self._ui_holding: str | None = None
+        self.show_profiler = False
+        self._item_panel: pygame.Surface | None = None
+
+        self.office = Office(size=SIZE, array_packages=array_packages, cull_simulation=cull_simulation)
+        self.office.generate_map(level)
+        for _ in range(staff):
+            self.office.add_postman()
+        STARTUP.mark("map build")
+        # quits once the first frame is up, for measuring startup
+        self.startup_only = startup_only
 
         # The same pointer is shared between Game and Office
         self.player = self.office.get_player()
 
-    def run(self):
-        while self.running:
-            self.deltatime = self.clock.tick(FPS)
-            self._check_should_close()
-
-            # updates
-            self.office.update(self.deltatime)
-            self.player.update(self.deltatime)
+        self.recorder: InputRecorder | None = None
+        if record_path != None:
+            assert isinstance(level, Level), "recordings only support the bundled levels"
+            self.recorder = InputRecorder(self.player.input, record_path, level, seed, self.timestep)
+            self.player.input = self.recorder
 
-            # renders
-            self.office.render(self.surf)
-            self.player.render(self.surf)
-            self.render_ui(self.surf)
-            self._draw_surface_on_display()
+        # a snapshot every simulated second, for F5 to rewind to and for the autosave
+        self.ticks = 0
+        self.snapshot_interval = max(1, round(1000 / self.timestep))
+        self.history = SnapshotHistory()
+        self.autosave_path = autosave_path
+        if snapshot != None:
+            self.ticks = self.office.restore(snapshot)
 
+    def run(self):
+        # the first frame goes out as soon as it is ready, the cap only paces the ones after it
+        fps = 0
+        while self.running:
+            self.deltatime = self.clock.tick(fps)
+            fps = self.fps
+            self._handle_events()
+
+            # updates, a slow frame is capped so we never spiral into catching up forever
+            self._accumulator += min(self.deltatime, MAX_FRAME_TIME)
+            while self._accumulator >= self.timestep:
+                self.update(self.timestep)
+                self._accumulator -= self.timestep
+
+            # renders, the overlay changes every frame so it always takes the full path
+            alpha = self._accumulator / self.timestep
+            if self.dirty_rendering and self._presented and not self.show_profiler:
+                self._render_dirty(alpha)
+            else:
+                with PROFILER.section("office.render"):
+                    self.office.render(self.surf, alpha)
+                self._render_player(alpha)
+                with PROFILER.section("render_ui"):
+                    self.render_ui(self.surf)
+                    if self.show_profiler:
+                        self._draw_profiler_overlay(self.surf)
+                with PROFILER.section("present"):
+                    self._draw_surface_on_display()
+                if "first frame" not in STARTUP.marks:
+                    STARTUP.mark("first frame")
+                    print(STARTUP.report())
+                    self.running = not self.startup_only
+                self._presented = True
+
+            PROFILER.end_frame()
+
+        self.close()
+
+    def close(self) -> None:
+        if self.recorder != None:
+            self.recorder.close()
+            self.recorder = None
+        PROFILER.close_trace()
+        print(self.presenter.report())
         pygame.quit()
 
-    def render_ui(self, surf: pygame.Surface) -> None:
-        self._draw_current_item_info(surf)
+    def update(self, dt: float) -> None:
+        with PROFILER.section("office.update"):
+            self.office.update(dt)
+        with PROFILER.section("postman.update"):
+            self.player.update(dt)
+        self.ticks += 1
+        if self.ticks % self.snapshot_interval == 0:
+            self._take_snapshot()
+
+    def _take_snapshot(self) -> None:
+        data = self.office.snapshot(self.ticks)
+        self.history.push(data)
+        if self.autosave_path != None:
+            write_snapshot(self.autosave_path, data)
+
+    def rewind(self, seconds: int = 1) -> None:
+        # a recording could not be replayed past a jump back in time
+        if self.recorder != None:
+            return
+        latest = self.history.latest
+        if latest == None:
+            return
+        # a snapshot taken since the last whole second is the first one back, unless the game is sitting on it
+        age = self.ticks - snapshot_ticks(latest)
+        data = self.history.rewind(seconds - 1 if 0 < age < self.snapshot_interval else seconds)
+        assert data != None
+        self.ticks = self.office.restore(data)
+        self._accumulator = 0
+        self._presented = False
+
+    def _render_dirty(self, alpha: float) -> None:
+        erase = [self._player_rect] if self._player_rect != None else []
+        with PROFILER.section("office.render"):
+            dirty = self.office.render_dirty(self.surf, erase, alpha)
+
+        self._render_player(alpha)
+        assert self._player_rect != None
+        dirty.append(self._player_rect)
+
+        with PROFILER.section("render_ui"):
+            dirty += self.render_ui(self.surf, force=False)
+        with PROFILER.section("present"):
+            self._update_display_rects(dirty)
+
+    def _render_player(self, alpha: float) -> None:
+        offset = self.office.camera.offset
+        self.surf.set_clip(pygame.Rect((0, 0), VIEW_DIMENSION))
+        self.player.render(self.surf, alpha, offset)
+        self.surf.set_clip(None)
+        self._player_rect = self.player.render_rect(alpha).move(-offset[0], -offset[1]).clip(pygame.Rect((0, 0), VIEW_DIMENSION))
+
+    def toggle_profiler(self) -> None:
+        self.show_profiler = not self.show_profiler
+        PROFILER.enabled = PROFILER.enabled or self.show_profiler
+        # the overlay has to be painted over once it is hidden again, it may reach past the office
+        self._presented = False
+        if not self.show_profiler:
+            self.surf.fill(0)
+
+    def _draw_profiler_overlay(self, surf: pygame.Surface) -> None:
+        # the numbers change every frame, caching them would only flush the ui text out of TEXT
+        font = TEXT.font(12)
+        lines = [f"fps: {self.clock.get_fps():.0f}", self.presenter.report()] + PROFILER.report()
+        for i, line in enumerate(lines):
+            text = font.render(line, False, (255, 255, 255), (0, 0, 0))
+            surf.blit(text, (2, 2 + i * text.get_height()))
+
+    def render_ui(self, surf: pygame.Surface, force: bool = True) -> list[pygame.Rect]:
+        return self._draw_current_item_info(surf, force)
+
+    def _draw_current_item_info(self, surf: pygame.Surface, force: bool = True) -> list[pygame.Rect]:
+        holding = str(self.player.currently_holding) if self.player.currently_holding != None else None
+        if not force and holding == self._ui_holding:
+            return []
+        self._ui_holding = holding
 
-    def _draw_current_item_info(self, surf: pygame.Surface) -> None:
         office_height = MAP_HEIGHT * SIZE
         margin_top = RENDER_DIMENSION[1] - office_height
         margin_left = RENDER_DIMENSION[0] / 2
 
-        window = pygame.Surface((margin_left, margin_top))
+        if self._item_panel == None:
+            self._item_panel = pygame.Surface((margin_left, margin_top))
+        window = self._item_panel
         window.fill((199, 164, 103))
 
+        if holding != None:
+            window.blit(TEXT.render(holding, 23), (0,0))
 
-        if self.player.currently_holding != None:
-            package = self.player.currently_holding
-            sysfont = pygame.font.get_default_font()
-            font = pygame.font.SysFont(sysfont, 23)
-            window.blit(font.render(str(package), False, (255,255,255)), (0,0))
-
-        surf.blit(window, (margin_left, office_height))
+        return [surf.blit(window, (margin_left, office_height))]
 
+    def _update_display_rects(self, rects: list[pygame.Rect]) -> None:
+        self.presenter.present_rects(self.surf, rects)
 
     def _draw_surface_on_display(self) -> None:
-        resized_surf = pygame.transform.scale(self.surf, self.display.get_size())
-        self.display.blit(resized_surf, (0,0))
-        pygame.display.flip()
-        self.display.fill(0)
-        self.surf.fill(0)
+        # every frame repaints the office and the panel over the last one, so nothing is cleared
+        self.presenter.present(self.surf)
 
-    def _check_should_close(self):
+    def _handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
+                self.close()
                 sys.exit()
 
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_profiler()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                self.rewind()
+
+class BotInput:
+    """
+    scripted postman, walks up to the nearest free package, picks it up and carries it
+    to the nearest drop off. it walks over the walkable cells, a breadth first search to
+    the cells a package can be picked up from and the office's walking distances to the drop offs.
+    the package it walks to is claimed in the office, so other bots go for a different one.
+    """
+    def __init__(self, office: Office, postman: Postman, search_radius: float = 40 * SIZE, attempts: int = 4) -> None:
+        self.office = office
+        self.postman = postman
+        self.search_radius = search_radius
+        # packages tried per tick before giving up until the next one
+        self.attempts = attempts
+        self.pressed: set[int] = set()
+        self._keys = PressedKeys(self.pressed)
+        self._target = Vec2(0, 0)
+        # packages no walk within the search radius leads to, until the bot picks one up or runs out
+        self._unreachable: set[Interactable] = set()
+        self._route_key: tuple[int, tuple[int, ...]] | None = None
+        self._route: list[int] | None = None
+
+    def advance(self) -> None:
+        postman = self.postman
+        self.pressed.clear()
+        cell = self._cell()
+        if postman.is_holding:
+            self.office.unclaim(postman)
+            self._unreachable.clear()
+            distances = self.office.drop_distances()
+            if distances[cell] == 0:
+                if self._steer_to(cell) and not postman.interact_on_cooldown:
+                    self.pressed.add(pygame.K_e)
+            elif distances[cell] > 0:
+                self._steer_to(next(neighbour for neighbour in self.office.grid._walkable_neighbours(cell)
+                                    if distances[neighbour] == distances[cell] - 1))
+            return
+
+        for _ in range(self.attempts):
+            package = self.office.find_package(postman.pos, self.search_radius, postman, self._unreachable)
+            if package == None:
+                self._unreachable.clear()
+                break
+            path = self._route_to(cell, self.office.pickup_cells(package))
+            if path != None:
+                break
+            self._unreachable.add(package)
+        else:
+            package = None
+        if package == None:
+            self.office.unclaim(postman)
+            return
+
+        self.office.claim(postman, package)
+        self._steer_to(path[0] if path else cell)
+        if postman.nearest_interactable != None and postman.can_interact and not postman.interact_on_cooldown:
+            self.pressed.add(pygame.K_e)
+
+    def _cell(self) -> int:
+        """the cell the middle of the postman is in"""
+        pos = self.postman.pos
+        x, y = self.office.grid.cell_of(pos.x + SIZE / 2, pos.y + SIZE / 2)
+        return y * self.office.map.width + x
+
+    def _route_to(self, cell: int, goals: list[int]) -> list[int] | None:
+        # the walk only changes once the bot or its package crosses into another cell
+        key = (cell, tuple(goals))
+        if key != self._route_key:
+            self._route_key = key
+            self._route = self.office.grid.route(cell, goals, int(self.search_radius // SIZE)) if goals else None
+        return self._route
+
+    def _steer_to(self, cell: int) -> bool:
+        width = self.office.map.width
+        return self._steer(self._target.set(cell % width * SIZE, cell // width * SIZE))
+
+    def _steer(self, target: Vec2, tolerance: float = 1.5) -> bool:
+        """presses towards the target and returns whether it is already there"""
+        dx = target.x - self.postman.pos.x
+        dy = target.y - self.postman.pos.y
+        if dx > tolerance:
+            self.pressed.add(pygame.K_d)
+        elif dx < -tolerance:
+            self.pressed.add(pygame.K_a)
+        if dy > tolerance:
+            self.pressed.add(pygame.K_s)
+        elif dy < -tolerance:
+            self.pressed.add(pygame.K_w)
+        return not self.pressed
+
+    def get_pressed(self) -> KeyState:
+        return self._keys
+
+class HeadlessGame:
+    """runs the office simulation without a display, as fast as possible"""
+    def __init__(self, level: Level | str = Level.test, input_source: TickInput | None = None,
+                 array_packages: bool = False, staff: int | None = None) -> None:
+        self.office = Office(size=SIZE, array_packages=array_packages)
+        self.office.generate_map(level)
+        # bots working next to the player, STAFF unless given
+        for _ in range(STAFF if staff == None else staff):
+            self.office.add_postman()
+        self.player = self.office.get_player()
+        self.input: TickInput = input_source if input_source != None else ScriptedInput()
+        self.player.input = self.input
+        self.ticks = 0
+
+    @classmethod
+    def from_snapshot(cls, data: bytes, input_source: TickInput | None = None,
+                      array_packages: bool = False) -> HeadlessGame:
+        game = cls(snapshot_level(data), input_source, array_packages, snapshot_postmen(data) - 1)
+        game.restore(data)
+        return game
+
+    def use_input(self, input_source: TickInput) -> None:
+        self.input = input_source
+        self.player.input = input_source
+
+    def snapshot(self) -> bytes:
+        return self.office.snapshot(self.ticks)
+
+    def restore(self, data: bytes) -> None:
+        self.ticks = self.office.restore(data)
+
+    def step(self, dt: float) -> None:
+        self.input.advance()
+        with PROFILER.section("office.update"):
+            self.office.update(dt)
+        with PROFILER.section("postman.update"):
+            self.player.update(dt)
+        self.ticks += 1
+        PROFILER.end_frame()
+
+    def run(self, ticks: int, dt: float) -> float:
+        """returns simulated ticks per wall-clock second"""
+        start = time.perf_counter()
+        for _ in range(ticks):
+            self.step(dt)
+        elapsed = time.perf_counter() - start
+        return ticks / elapsed if elapsed > 0 else float('inf')
+
+def percentile(ordered: list[float], q: float) -> float:
+    """nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run_replay(path: str, array_packages: bool = False, timings_path: str | None = None) -> list[float]:
+    """replays a recording headlessly and returns the wall-clock milliseconds every tick took"""
+    replay = ReplayInput(path)
+    seed_simulation(replay.seed)
+    game = HeadlessGame(replay.level, replay, array_packages)
+
+    timings: list[float] = []
+    while not replay.exhausted:
+        start = time.perf_counter_ns()
+        game.step(replay.dt)
+        timings.append((time.perf_counter_ns() - start) / 1e6)
+
+    if timings_path != None:
+        with open(timings_path, "w") as file:
+            file.write("tick,ms\n")
+            for tick, ms in enumerate(timings):
+                file.write(f"{tick},{ms:.6f}\n")
+
+    ordered = sorted(timings)
+    total = sum(timings)
+    print(f"replay: {path}, level: {replay.level.name}, seed: {replay.seed}, ticks: {len(timings)}")
+    if timings:
+        print(f"total: {total:.1f}ms, mean: {total / len(timings):.4f}ms, "
+              f"p50: {percentile(ordered, 50):.4f}ms, p95: {percentile(ordered, 95):.4f}ms, "
+              f"p99: {percentile(ordered, 99):.4f}ms, max: {ordered[-1]:.4f}ms")
+    print(f"delivered: {game.office.packages_delivered}")
+    return timings
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ludum Dare 53 - post office")
+    parser.add_argument("--headless", action="store_true", help="run the simulation without a display")
+    parser.add_argument("--ticks", type=int, default=10_000, help="ticks to simulate when headless")
+    parser.add_argument("--dt", type=float, default=None, help="milliseconds per headless tick, defaults to one tick at --tick-rate")
+    parser.add_argument("--tick-rate", type=float, default=TICK_RATE, help="simulation steps per second")
+    parser.add_argument("--fps", type=int, default=FPS, help="render frame rate cap")
+    parser.add_argument("--seed", type=int, default=None, help="seed for every random decision in the simulation")
+    parser.add_argument("--level", type=int, default=Level.test.value, help="level number to load")
+    parser.add_argument("--map", type=str, default=None, help="path to a level file, instead of --level")
+    parser.add_argument("--compile-levels", action="store_true", help="prebuild the compiled level cache and exit")
+    parser.add_argument("--script", type=str, default="", help="headless input script, i.e '0:d,120:de,240:'")
+    parser.add_argument("--bot", action="store_true", help="let the scripted bot play instead of --script")
+    parser.add_argument("--staff", type=int, default=STAFF, help="scripted postmen working alongside the player")
+    parser.add_argument("--array-packages", action="store_true", help="store packages in numpy columns (requires numpy)")
+    parser.add_argument("--record", type=str, default=None, help="write every tick's input to a replay file")
+    parser.add_argument("--replay", type=str, default=None, help="replay a recording headlessly and report per-tick timing")
+    parser.add_argument("--timings", type=str, default=None, help="csv file for the per-tick timings of --replay")
+    parser.add_argument("--profile", action="store_true", help="time every subsystem, F3 shows the overlay in game")
+    parser.add_argument("--trace", type=str, default=None, help="write per-frame timings to a .csv or json lines file")
+    parser.add_argument("--full-redraw", action="store_true", help="redraw and present the whole screen every frame")
+    parser.add_argument("--no-cull", action="store_true", help="simulate the whole map in the window, not only around the view and postmen")
+    parser.add_argument("--snapshot", type=str, default=None, help="write the simulation state to a file after a headless run")
+    parser.add_argument("--from-snapshot", type=str, default=None, help="start from a snapshot instead of a fresh level")
+    parser.add_argument("--autosave", type=str, default=None, help="keep a snapshot of the running game in this file, refreshed every second")
+    parser.add_argument("--startup", action="store_true", help="print the startup timeline and quit after the first frame")
+    parser.add_argument("--scale", type=str, default=ScaleMode.nearest.name, choices=[mode.name for mode in ScaleMode],
+                        help="how the render surface is scaled to the window")
+    return parser.parse_args(argv)
+
+def level_from_args(args: argparse.Namespace) -> Level | str:
+    return args.map if args.map != None else Level(args.level)
+
+def run_headless(args: argparse.Namespace) -> None:
+    if args.seed != None:
+        seed_simulation(args.seed)
+    if args.dt == None:
+        args.dt = 1000 / args.tick_rate
+    input_source: TickInput = ScriptedInput.from_string(args.script)
+    if args.from_snapshot != None:
+        game = HeadlessGame.from_snapshot(read_snapshot(args.from_snapshot), input_source, args.array_packages)
+    else:
+        game = HeadlessGame(level_from_args(args), input_source, args.array_packages, args.staff)
+    if args.bot:
+        # the bot reads the office it plays in, so it can only be made once the game is
+        input_source = BotInput(game.office, game.player)
+    recorder = None
+    if args.record != None:
+        recorder = InputRecorder(input_source, args.record, Level(args.level), args.seed, args.dt)
+        input_source = recorder
+    game.use_input(input_source)
+    # a snapshot brings its deliveries along, the rate only counts this run's
+    delivered = game.office.packages_delivered
+    ticks_per_second = game.run(args.ticks, args.dt)
+    simulated_seconds = args.ticks * args.dt / 1000
+    print(f"ticks: {args.ticks}, dt: {args.dt:.2f}ms, simulated: {simulated_seconds:.1f}s")
+    print(f"ticks/sec: {ticks_per_second:.0f} ({ticks_per_second * args.dt / 1000:.1f}x real time)")
+    in_flight = len(game.office.package_store) if game.office.package_store != None else len(game.office.packages)
+    print(f"packages in flight: {in_flight}, delivered: {game.office.packages_delivered}, backlog: {game.office.backlog}")
+    if simulated_seconds > 0:
+        print(f"postmen: {len(game.office.postmen)}, delivered per minute: {(game.office.packages_delivered - delivered) / simulated_seconds * 60:.1f}")
+    capacity = game.office.flow.capacity()
+    print(f"belt capacity: {sum(capacity.values())} packages over {len(capacity)} ends")
+    print(f"assets: {ASSETS.stats}")
+    if args.snapshot != None:
+        start = time.perf_counter()
+        data = game.snapshot()
+        elapsed = (time.perf_counter() - start) * 1e6
+        write_snapshot(args.snapshot, data)
+        print(f"snapshot: {len(data)} bytes at tick {game.ticks} in {elapsed:.0f}us, written to {args.snapshot}")
+    if PROFILER.enabled:
+        print("\n".join(PROFILER.report()))
+        PROFILER.close_trace()
+    if recorder != None:
+        recorder.close()
+
+STARTUP.mark("import")
+
 if __name__ == "__main__":
-    pygame.init()
-    pygame.font.init()
-    game = Game(DISPLAY_DIMESION)
+    args = parse_args(sys.argv[1:])
+    if args.compile_levels:
+        compile_levels()
+        sys.exit()
+
+    PROFILER.enabled = args.profile or args.trace != None
+    if args.trace != None:
+        PROFILER.open_trace(args.trace)
+
+    if args.replay != None:
+        run_replay(args.replay, args.array_packages, args.timings)
+        sys.exit()
+
+    if args.record != None and args.map != None:
+        sys.exit("recordings only support the bundled levels, use --level")
+
+    if args.record != None and args.from_snapshot != None:
+        sys.exit("recordings start from a fresh level, drop --from-snapshot")
+
+    if args.record != None and args.staff:
+        sys.exit("recordings only replay the player, drop --staff")
+
+    if args.record != None and args.seed == None:
+        # a replay is only reproducible with a known seed
+        args.seed = random.randrange(2 ** 31)
+
+    if args.headless:
+        run_headless(args)
+        sys.exit()
+
+    # fonts and the rest of pygame start on first use, the first frame only needs the display
+    pygame.display.init()
+    if args.seed != None:
+        seed_simulation(args.seed)
+
+    snapshot = read_snapshot(args.from_snapshot) if args.from_snapshot != None else None
+    game = Game(DISPLAY_DIMESION, dirty_rendering=not args.full_redraw, array_packages=args.array_packages,
+                tick_rate=args.tick_rate, fps=args.fps,
+                level=snapshot_level(snapshot) if snapshot != None else level_from_args(args),
+                record_path=args.record, seed=args.seed if args.seed != None else 0,
+                scale_mode=ScaleMode[args.scale], snapshot=snapshot, autosave_path=args.autosave,
+                startup_only=args.startup, cull_simulation=not args.no_cull, staff=snapshot_postmen(snapshot) - 1 if snapshot != None else args.staff)
     game.run()
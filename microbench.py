@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+
+import main
+from main import Vec2
+
+
+def count_vectors(ticks: int, seed: int, array_packages: bool) -> tuple[int, int]:
+    """vectors created while the seeded bot plays, after the map is loaded and warmed up"""
+    main.seed_simulation(seed)
+    game = main.HeadlessGame(main.Level.test, array_packages=array_packages)
+    game.use_input(main.BotInput(game.office, game.player))
+    game.run(60, 1000 / main.TICK_RATE)
+
+    created = 0
+    def counting_new(cls, *_):
+        nonlocal created
+        created += 1
+        return object.__new__(cls)
+
+    Vec2.__new__ = counting_new
+    try:
+        game.run(ticks, 1000 / main.TICK_RATE)
+    finally:
+        del Vec2.__new__
+    return created, game.office.packages_delivered
+
+
+def time_ops(number: int) -> dict[str, float]:
+    """nanoseconds per call, the allocating operators next to their in-place versions"""
+    a = Vec2(1.5, 2.5)
+    b = Vec2(0.25, -0.75)
+    out = Vec2(0, 0)
+    # the batch helpers over as many positions as a crowded office has postmen
+    positions = [Vec2(i * 16.0, i * 8.0) for i in range(64)]
+    targets = [Vec2(0, 0) for _ in positions]
+    ops = {
+        "a + b": lambda: a + b,
+        "a += b": lambda: a.__iadd__(b),
+        "a.copy()": lambda: a.copy(),
+        "a.set_from(b)": lambda: out.set_from(b),
+        "a.lerp(b)": lambda: a.lerp(b, .5),
+        "a.lerp_into(b)": lambda: a.lerp_into(b, .5, out),
+        "a.distance(b)": lambda: a.distance(b),
+        "a.chebyshev_distance(b)": lambda: a.chebyshev_distance(b),
+        "copy_positions(64)": lambda: main.copy_positions(positions, targets),
+        "translate_positions(64)": lambda: main.translate_positions(targets, .5, -.5),
+        "nearest_position(64)": lambda: main.nearest_position(positions, a),
+        "positions_within(64)": lambda: main.positions_within(positions, a, 64),
+    }
+    return {name: timeit.timeit(op, number=number) / number * 1e9 for name, op in ops.items()}
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="vector allocations per tick and the cost of vector operations")
+    parser.add_argument("--ticks", type=int, default=5000, help="ticks to count allocations over")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the bot run")
+    parser.add_argument("--number", type=int, default=200_000, help="calls per timed operation")
+    parser.add_argument("--array-packages", action="store_true", help="store packages in numpy columns")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    for name, nanoseconds in time_ops(args.number).items():
+        print(f"{name:>24}: {nanoseconds:6.1f}ns")
+
+    # counting patches Vec2.__new__, which can not be cleanly undone, so it goes last
+    created, delivered = count_vectors(args.ticks, args.seed, args.array_packages)
+    print(f"vectors created: {created} over {args.ticks} ticks, {created / args.ticks:.3f} per tick ({delivered} delivered)")
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# the simulation loads its assets and levels relative to the repository, and never needs a window
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import itertools
+
+import pytest
+
+import main
+import levelgen
+
+
+@pytest.fixture
+def generated_level(tmp_path):
+    """writes a levelgen level to a file and returns its path"""
+    names = itertools.count()
+    def generate(width: int = 60, height: int = 30, **options) -> str:
+        path = tmp_path / f"generated-{next(names)}"
+        path.write_text(levelgen.generate_level(width, height, **options), encoding="utf-8")
+        return str(path)
+    return generate
+
+
+@pytest.fixture
+def warehouse(generated_level) -> str:
+    """a level large enough to keep a crowd of postmen busy"""
+    return generated_level(60, 30, seed=0, conveyors=8)
+
+
+@pytest.fixture
+def bot_game():
+    """a seeded headless game with the bot playing the player"""
+    def start(level: main.Level | str = main.Level.test, staff: int = 0, seed: int = 1,
+              array_packages: bool = False) -> main.HeadlessGame:
+        main.seed_simulation(seed)
+        game = main.HeadlessGame(level, array_packages=array_packages, staff=staff)
+        game.use_input(main.BotInput(game.office, game.player))
+        return game
+    return start
@@ -0,0 +1,46 @@
+import main
+
+
+def same_level(a: main.CompiledLevel, b: main.CompiledLevel) -> bool:
+    return ((a.width, a.height, a.tiles, a.player_start, a.drop_ofs, a.spawners) ==
+            (b.width, b.height, b.tiles, b.player_start, b.drop_ofs, b.spawners))
+
+
+def test_compiled_level_survives_the_byte_round_trip(generated_level):
+    with open(generated_level(seed=2), encoding="utf-8") as file:
+        level = main.compile_level(file.read())
+    assert level.spawners and level.drop_ofs and level.player_start != None
+    data = level.to_bytes()
+    assert same_level(main.CompiledLevel.from_bytes(data), level)
+    assert main.CompiledLevel.from_bytes(data).to_bytes() == data
+
+
+def test_load_level_compiles_once_and_reads_the_cache_after(generated_level, tmp_path, monkeypatch):
+    path = generated_level(seed=2)
+    cache = str(tmp_path / "cache")
+    compiled = main.load_level(path, cache)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    def compile_level(source: str) -> main.CompiledLevel:
+        raise AssertionError("compiled a level that was cached")
+    monkeypatch.setattr(main, "compile_level", compile_level)
+    assert same_level(main.load_level(path, cache), compiled)
+
+
+def test_edited_level_is_compiled_again(generated_level, tmp_path):
+    path = generated_level(seed=2)
+    cache = str(tmp_path / "cache")
+    main.load_level(path, cache)
+    edited = generated_level(seed=3)
+    with open(edited, encoding="utf-8") as source, open(path, "w", encoding="utf-8") as file:
+        file.write(source.read())
+    assert same_level(main.load_level(path, cache), main.compile_level(open(edited, encoding="utf-8").read()))
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_compiled_level_files_load_as_they_are(tmp_path):
+    level = main.load_level(main.level_path(main.Level.test))
+    path = tmp_path / "compiled"
+    path.write_bytes(level.to_bytes())
+    assert same_level(main.load_level(str(path), str(tmp_path / "cache")), level)
+    assert not (tmp_path / "cache").exists()
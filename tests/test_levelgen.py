@@ -0,0 +1,16 @@
+import pytest
+
+import main
+import levelgen
+
+
+def test_same_arguments_give_the_same_level():
+    assert levelgen.generate_level(60, 30, seed=3) == levelgen.generate_level(60, 30, seed=3)
+    assert levelgen.generate_level(60, 30, seed=3) != levelgen.generate_level(60, 30, seed=4)
+
+
+@pytest.mark.parametrize("size, seed", [((25, 11), seed) for seed in range(6)] + [((60, 30), 0), ((120, 60), 1)])
+def test_bots_deliver_on_generated_levels(generated_level, bot_game, size, seed):
+    game = bot_game(generated_level(*size, seed=seed), staff=2)
+    game.run(60 * main.TICK_RATE, 1000 / main.TICK_RATE)
+    assert game.office.packages_delivered > 0
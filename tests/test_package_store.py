@@ -0,0 +1,65 @@
+import pygame
+import pytest
+
+import main
+
+pytest.importorskip("numpy")
+
+DT = 1000 / main.TICK_RATE
+VARIATION = next(iter(main.PackageVariation))
+
+
+def test_delivered_slots_are_reused_with_a_fresh_view():
+    store = main.PackageStore(capacity=2)
+    store.spawn((0, 0), main.Direction.right, VARIATION)
+    second = store.spawn((16, 0), main.Direction.right, VARIATION)
+    store.spawn((32, 0), main.Direction.right, VARIATION)
+    assert store.capacity >= 3 and len(store) == 3
+    view = store.view(second)
+    assert store.view(second) is view
+    assert (view.pos.x, view.pos.y) == (16, 0)
+
+    store.remove(second)
+    assert len(store) == 2
+    assert store.spawn((48, 0), main.Direction.left, VARIATION) == second
+    assert store.view(second) is not view
+    assert (store.view(second).pos.x, store.view(second).pos.y) == (48, 0)
+
+
+@pytest.mark.parametrize("level, staff", [(main.Level.test, 0), ("warehouse", 4)])
+def test_array_store_delivers_like_package_objects(request, bot_game, level, staff):
+    if level == "warehouse":
+        level = request.getfixturevalue("warehouse")
+    results = []
+    for array_packages in (False, True):
+        game = bot_game(level, staff, array_packages=array_packages)
+        game.run(3600, DT)
+        office = game.office
+        in_flight = len(office.package_store) if array_packages else len(office.packages)
+        results.append((office.packages_delivered, in_flight))
+    objects, arrays = results
+    assert objects[0] > 0
+    assert arrays == objects
+
+
+def test_render_draws_every_visible_package_without_asset_lookups(bot_game):
+    game = bot_game(array_packages=True)
+    game.run(600, DT)
+    store = game.office.package_store
+    assert len(store)
+    view = game.office.camera.rect
+    surf = pygame.Surface(view.size)
+    store.render(surf, 1, view)
+
+    hits, misses = main.ASSETS.hits, main.ASSETS.misses
+    surf.fill(0)
+    store.render(surf, 1, view)
+    assert (main.ASSETS.hits, main.ASSETS.misses) == (hits, misses)
+
+    expected = pygame.Surface(view.size)
+    for slot in main.np.flatnonzero(store.alive).tolist():
+        package = store.view(slot)
+        area = main.ATLAS.image(f"assets/{package.variation.name}.png")
+        expected.blit(main.ATLAS.surface, (int(package.pos.x) - view.x, int(package.pos.y) - view.y), area)
+    assert surf.get_bounding_rect().width
+    assert pygame.image.tobytes(surf, "RGB") == pygame.image.tobytes(expected, "RGB")
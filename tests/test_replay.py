@@ -0,0 +1,34 @@
+import main
+
+DT = 1000 / main.TICK_RATE
+
+
+def test_replay_runs_exactly_the_recorded_ticks(tmp_path):
+    path = str(tmp_path / "run.rep")
+    main.seed_simulation(3)
+    recorder = main.InputRecorder(main.ScriptedInput.from_string("0:d,120:de,240:s,400:"), path, main.Level.test, 3, DT)
+    recorded = main.HeadlessGame(main.Level.test, recorder)
+    recorded.run(600, DT)
+    recorder.close()
+
+    timings = main.run_replay(path)
+    assert len(timings) == 600
+
+    replay = main.ReplayInput(path)
+    main.seed_simulation(replay.seed)
+    replayed = main.HeadlessGame(replay.level, replay)
+    while not replay.exhausted:
+        replayed.step(replay.dt)
+    assert replayed.ticks == 600
+    assert replayed.snapshot() == recorded.snapshot()
+
+
+def test_headless_bot_runs_record_the_bot(tmp_path, capsys):
+    path = str(tmp_path / "bot.rep")
+    main.run_headless(main.parse_args(["--headless", "--bot", "--seed", "5", "--ticks", "3000", "--record", path]))
+    recorded = capsys.readouterr().out
+    assert "delivered: 0," not in recorded
+
+    assert len(main.run_replay(path)) == 3000
+    delivered = recorded.split("delivered: ")[1].split(",")[0]
+    assert capsys.readouterr().out.endswith(f"delivered: {delivered}\n")
@@ -0,0 +1,33 @@
+import main
+
+DT = 1000 / main.TICK_RATE
+
+
+def test_restored_snapshot_continues_like_the_original(bot_game):
+    game = bot_game(staff=2, seed=2)
+    game.run(600, DT)
+    data = game.snapshot()
+    game.run(600, DT)
+
+    restored = main.HeadlessGame.from_snapshot(data)
+    restored.use_input(main.BotInput(restored.office, restored.player))
+    assert restored.snapshot() == data
+    restored.run(600, DT)
+    assert restored.office.packages_delivered == game.office.packages_delivered
+    assert restored.snapshot() == game.snapshot()
+
+
+def test_rewind_restores_a_snapshot_taken_under_a_second_ago():
+    main.seed_simulation(2)
+    game = main.Game(main.RENDER_DIMENSION, tick_rate=main.TICK_RATE)
+    for _ in range(game.snapshot_interval * 3 + game.snapshot_interval // 2):
+        game.update(DT)
+    newest = game.history.latest
+
+    game.rewind()
+    assert game.ticks == game.snapshot_interval * 3
+    assert game.office.snapshot(game.ticks) == newest
+
+    # sitting on the newest snapshot, the next rewind goes a whole second further back
+    game.rewind()
+    assert game.ticks == game.snapshot_interval * 2
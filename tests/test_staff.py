@@ -0,0 +1,30 @@
+import pytest
+
+import main
+
+DT = 1000 / main.TICK_RATE
+
+
+def test_throughput_grows_with_staff_on_a_generated_level(warehouse, bot_game):
+    delivered = []
+    for staff in (0, 2, 8):
+        game = bot_game(warehouse, staff)
+        game.run(60 * main.TICK_RATE, DT)
+        delivered.append(game.office.packages_delivered)
+    alone, few, many = delivered
+    assert 0 < alone < few < many
+
+
+@pytest.mark.parametrize("array_packages", [False, True])
+def test_bots_never_hold_or_claim_the_same_package(warehouse, bot_game, array_packages):
+    game = bot_game(warehouse, staff=16, array_packages=array_packages)
+    for _ in range(2400):
+        game.step(DT)
+        held = [postman.currently_holding for postman in game.office.postmen if postman.is_holding]
+        claimed = list(game.office.claims.values())
+        assert len({id(package) for package in held}) == len(held)
+        assert len({id(package) for package in claimed}) == len(claimed)
+        if array_packages:
+            # a delivered slot is free for the next package spawned, nobody may still be holding it
+            assert all(game.office.package_store.alive[package.slot] for package in held)
+            assert len({package.slot for package in held}) == len(held)